@@ -0,0 +1,88 @@
+from collections import deque
+from typing import Iterable
+
+
+class KeywordAutomaton:
+    """
+    A multi-pattern matcher (Aho-Corasick automaton)
+
+    Finds all keywords of a list in a text in a single pass over the text,
+    independent of the number of keywords. Matching is case-insensitive.
+
+    Attributes
+    ----------
+    keywords : list[str]
+        The keywords to search for
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Parameters
+        ----------
+        keywords : Iterable[str]
+            The keywords to search for, empty keywords are ignored
+        """
+        self.keywords = [keyword for keyword in dict.fromkeys(keywords) if keyword]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [frozenset()]
+        self._build()
+
+    def __repr__(self):
+        return f"KeywordAutomaton(keywords={len(self.keywords)})"
+
+    def _build(self) -> None:
+        """
+        Builds the keyword trie and the failure links
+        """
+        outputs = [set()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword.casefold():
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            outputs[state].add(keyword)
+
+        # breadth first, so that the failure state of a node is complete
+        # before the node itself is visited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                outputs[child] |= outputs[self._fail[child]]
+                queue.append(child)
+
+        self._output = [frozenset(output) for output in outputs]
+
+    def search(self, text: str) -> frozenset:
+        """
+        Finds the keywords contained in a text
+
+        Parameters
+        ----------
+        text : str
+            The text to scan
+
+        Returns
+        -------
+        frozenset[str]
+            The keywords found in the text
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return frozenset(found)
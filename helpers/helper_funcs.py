@@ -1,8 +1,11 @@
 import logging
+import traceback as tb
 from types import TracebackType
 from typing import Type
 import sys
 
+from modules.events import log
+
 
 def exception_handler(
     exception_type: Type[BaseException],
@@ -29,5 +32,12 @@ def exception_handler(
     logging.error(
         f"\nException type: {exception_type.__name__} \nException: {exception} \nTraceback: {traceback}"
     )
+    log.emit(
+        "exception",
+        type=exception_type.__name__,
+        message=str(exception),
+        traceback="".join(tb.format_tb(traceback)) if traceback else None,
+    )
+    log.flush()
 
     sys.__excepthook__(exception_type, exception, traceback)
@@ -1,3 +1,6 @@
+from modules.events import log
+
+
 class colors:
     """
     bcolors class to color the output of the program
@@ -15,6 +18,9 @@ class colors:
 
 def print_color(color: colors, text):
     """
-    Print the text with the color specified
+    Records the text as message in the event log, printed with the color
+    specified if the log echoes messages
     """
-    print(f"{color} {text} {colors.ENDC}")
+    log.emit("message", text=str(text))
+    if log.echo:
+        print(f"{color} {text} {colors.ENDC}")
@@ -1,11 +1,32 @@
+import argparse
+import os
 import sys
 
+from modules.events import LOG_DIRECTORY, log
 from modules.JET import JETester
 from helpers.helper_funcs import exception_handler
+from reports.reports import ReporterFactory
 
 
 def main():
-    pass
+    parser = argparse.ArgumentParser(description="Journal entry testing")
+    commands = parser.add_subparsers(dest="command")
+
+    serve = commands.add_parser("serve", help="keep a journal warm for clients")
+    serve.add_argument("path", help="the engagement directory")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        from modules.server import JournalServer
+
+        log.configure(os.path.join(args.path, LOG_DIRECTORY))
+        jet = JETester(args.path, ReporterFactory().get_reporter("plotly"))
+        server = JournalServer(jet, args.host, args.port)
+        print(f"Serving {jet} on {server.url}")
+        server.serve_forever()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,21 @@
-import importlib
+import importlib.util
 import json
 import os
+import numpy as np
 import pandas as pd
 
+from modules import sampling
+from modules.bitsets import FlagSet
+from modules.checkpoints import CheckpointStore, fingerprint
+from modules.comparison import PeriodComparison
+from modules.events import LOG_DIRECTORY, EventLog, log
+from modules.progress import Progress
+from modules.scheduler import ScenarioScheduler
+from modules.importer import JOURNAL_FILE, JournalImporter
+from modules.indexes import SecondaryIndex, index_path, intersect
+from modules.jet_tetsts import JBPreparation
+from modules.scoring import RiskScorer, partition_flags
+from modules.workbook import WorkbookExporter, sheets
 from reports.reports import Report, ReportContext
 
 
@@ -10,6 +23,16 @@ from reports.reports import Report, ReportContext
 # since the quality and the completeness of the dataset is unknown
 
 
+def _rows(result):
+    """
+    Returns the number of rows of a scenario result, per table for
+    scenarios returning several tables
+    """
+    if isinstance(result, dict):
+        return {part: _rows(table) for part, table in result.items()}
+    return len(result) if hasattr(result, "__len__") else None
+
+
 class JETester:
     """
     A class to perform journal entry tests
@@ -18,6 +41,18 @@ class JETester:
     ----------
     path : str
         The path to the journal entry test
+    data : dict
+        The journal entries of data.json, loaded on first access
+    df : pd.DataFrame
+        The journal entries as dataframe, read on first access from the
+        imported journal.parquet or else created from data
+    log : EventLog
+        The event log of the engagement in its logs directory, with the
+        events of its scenarios and imports; the first engagement of a
+        process shares the event log of the process
+    preparation : JBPreparation
+        The last preparation of the journal with its coercion failures and
+        memory report, see prepare
 
     Methods
     -------
@@ -36,10 +71,19 @@ class JETester:
         None
         """
         self.path = path if os.path.exists(path) else os.mkdir(path) or path
-        self.df = None
+        self._data = None
+        self._df = None
+        self._digest = None
+        self.preparation = None
         self.reporter = reporter
         self.config = {}
+        self.indexes = {}
         self._load()
+        self.checkpoints = CheckpointStore(self.path)
+        directory = os.path.join(self.path, LOG_DIRECTORY)
+        log.configure_default(directory)
+        shared = os.path.abspath(os.path.dirname(log.path()))
+        self.log = log if shared == os.path.abspath(directory) else EventLog(directory)
 
     def __version__(self):
         return "0.0.1"
@@ -53,9 +97,115 @@ class JETester:
     def __print__(self):
         return f"{self}"
 
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._load_data()
+        return self._data
+
+    @data.setter
+    def data(self, value: dict) -> None:
+        self._data = value
+        self._df = None
+        self._digest = None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            self.load()
+        return self._df
+
+    def load(self, progress: Progress = None, batch_size: int = 1_000_000):
+        """
+        Loads the journal into df, from the imported journal.parquet or
+        else from data.json
+
+        data.json is converted in the checkpointed stage "load", keyed by the
+        size and modification time of the file, so that it is parsed again
+        only if it changed.
+
+        Parameters
+        ----------
+        progress : Progress
+            Advanced per batch of rows read from journal.parquet or per
+            column taken from data.json, cancellation discards the rows read
+        batch_size : int
+            The number of rows read from journal.parquet at a time
+
+        Returns
+        -------
+        pd.DataFrame
+            The journal
+
+        Raises
+        ------
+        OperationCancelled
+            If the cancellation was requested
+        """
+        if os.path.exists(self.path + JOURNAL_FILE):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            file = pq.ParquetFile(self.path + JOURNAL_FILE)
+            if progress is not None:
+                progress.start("load", file.metadata.num_rows)
+            batches = []
+            for batch in file.iter_batches(batch_size=batch_size):
+                batches.append(batch)
+                if progress is not None:
+                    progress.advance(batch.num_rows)
+            dataframe = pa.Table.from_batches(
+                batches, schema=file.schema_arrow
+            ).to_pandas()
+        else:
+            if progress is not None:
+                progress.start("load", unit="columns")
+
+            def build(*_):
+                data = self.data
+                if progress is not None:
+                    progress.start("load", len(data), unit="columns")
+                columns = {}
+                for column, values in data.items():
+                    columns[column] = pd.Series(values)
+                    if progress is not None:
+                        progress.advance(1)
+                return pd.DataFrame(columns)
+
+            if self._data is None:
+                stat = os.stat(self._get_data_path())
+                dataframe = self.run_stage(
+                    "load", build, "data.json", stat.st_size, stat.st_mtime_ns
+                )
+            else:
+                dataframe = build()
+
+        if progress is not None:
+            progress.finish()
+        self._df = dataframe
+        self._digest = None
+        return dataframe
+
+    @df.setter
+    def df(self, value: pd.DataFrame) -> None:
+        self._df = value
+        self._digest = None
+
+    def digest(self) -> str:
+        """
+        Returns the content hash of the journal in df, see
+        checkpoints.fingerprint
+
+        The hash is computed once and kept until df or data is replaced, so
+        a journal changed in place must be assigned to df again.
+        """
+        if self._digest is None:
+            self._digest = fingerprint(self.df)
+        return self._digest
+
     def _check_dependencies(self):
         """
-        Checks if the dependencies are installed
+        Checks if the dependencies are installed, without importing them
 
         Returns
         -------
@@ -65,15 +215,17 @@ class JETester:
             if isinstance(self.config["dependencies"], list):
                 for dependency in self.config["dependencies"]:
                     try:
-                        importlib.import_module(dependency)
-                    except ImportError:
+                        spec = importlib.util.find_spec(dependency)
+                    except (ImportError, ValueError):
+                        spec = None
+                    if spec is None:
                         raise ImportError(f"Dependency {dependency} not installed")
             else:
                 raise TypeError("Dependencies must be a list")
 
     def _load(self) -> None:
+        # the data is loaded on first access, see data and df
         self._load_config()
-        self._load_data()
         self._check_dependencies()
 
     def _load_config(self) -> None:
@@ -101,7 +253,6 @@ class JETester:
             )
 
     def _load_data(self):
-        self.data = {}
         with open(self.path + "data.json") as f:
             self.data = json.load(f)
 
@@ -141,9 +292,35 @@ class JETester:
         return self.path
 
     def _get_df(self):
-        return self.df if self.df is not None else pd.DataFrame(self.data)
+        return self.df
+
+    def import_extracts(self, max_workers: int = 4, progress: Progress = None) -> list:
+        """
+        Imports the general ledger extracts of the client into journal.parquet
+
+        The sources and the column schema are configured in config.json
+        ("import" and "schema"), see modules.importer.
+
+        Parameters
+        ----------
+        max_workers : int
+            The maximum number of files read at the same time
+        progress : Progress
+            Advanced per imported file
 
-    def export_df(self, dataframe, type="csv") -> None:
+        Returns
+        -------
+        list[dict]
+            The control totals per file for the JB0 reconciliation
+        """
+        journal, manifest = JournalImporter(self.path, self.config, self.log).run(
+            max_workers, progress
+        )
+        self.df = journal
+        self.indexes = {}
+        return manifest
+
+    def export_df(self, dataframe, type="csv", name="data") -> None:
         """
         Exports the dataframe to a csv or excel file
 
@@ -151,6 +328,8 @@ class JETester:
         ----------
         type : str
             The type of file to export to (either 'csv' or 'excel')
+        name : str
+            The name of the file without extension
 
         Returns
         -------
@@ -158,16 +337,493 @@ class JETester:
         """
         if isinstance(dataframe, pd.DataFrame):
             if type == "csv":
-                return dataframe.to_csv(f"{self.path}\\data.csv")
+                return dataframe.to_csv(f"{self.path}\\{name}.csv")
             elif type == "excel":
                 return dataframe.to_excel(
-                    f"{self.path}\\data.xlsx", engine="xlsxwriter"
+                    f"{self.path}\\{name}.xlsx", engine="xlsxwriter"
                 )
             else:
                 raise ValueError("type must be either 'csv' or 'excel'")
         else:
             raise TypeError("dataframe must be a pandas dataframe")
 
+    def export_workbook(
+        self,
+        results: dict,
+        name: str = "results",
+        max_rows: int = None,
+        max_workers: int = 4,
+        progress: Progress = None,
+    ) -> str:
+        """
+        Exports the results of the scenarios, samples and summaries to one
+        workbook with a sheet per table, as the checkpointed stage "export",
+        which skips writing a workbook of the same tables again
+
+        Parameters
+        ----------
+        results : dict
+            The tables by sheet name, e.g. the results of run_scenarios;
+            scenarios returning several tables get a sheet per table
+        name : str
+            The name of the workbook without extension
+        max_rows : int
+            The maximum number of rows per sheet before continuing on an
+            overflow sheet, by default the rows of an Excel sheet
+        max_workers : int
+            The maximum number of tables converted at the same time
+        progress : Progress
+            Advanced per written table
+
+        Returns
+        -------
+        str
+            The path of the workbook
+        """
+        exporter = (
+            WorkbookExporter() if max_rows is None else WorkbookExporter(max_rows)
+        )
+        tables = sheets(results)
+        path = os.path.join(self.path, f"{name}.xlsx")
+        # a workbook deleted since is written again
+        if not os.path.exists(path):
+            self.checkpoints.invalidate(f"export:{name}")
+        return self.run_stage(
+            f"export:{name}",
+            lambda *_: exporter.export(tables, path, max_workers, progress),
+            tables,
+            exporter.max_rows,
+            exporter.date_format,
+        )
+
+    def run_stage(self, stage: str, function, *inputs):
+        """
+        Runs a pipeline stage with a checkpoint in the engagement directory
+
+        The stage is skipped and its stored output returned if it completed
+        before with inputs of the same hash.
+
+        Parameters
+        ----------
+        stage : str
+            The unique name of the stage, e.g. 'load', 'prepare' or 'export'
+        function : callable
+            The stage, called with the inputs
+        *inputs
+            The inputs of the stage
+
+        Returns
+        -------
+        Any
+            The output of the stage
+        """
+        return self.checkpoints.run(stage, function, *inputs)
+
+    def _run_scenario_stage(self, stage: str, scenario, function, *inputs):
+        """
+        Runs a stage of a scenario, checkpointing the attributes the scenario
+        names in checkpointed with the output and restoring them on resume
+        """
+
+        def run(*_):
+            state = {}
+            output = function()
+            for attribute in scenario.checkpointed:
+                state[attribute] = getattr(scenario, attribute)
+            return output, state
+
+        output, state = self.run_stage(stage, run, *inputs)
+        for attribute, value in state.items():
+            setattr(scenario, attribute, value)
+        return output
+
+    def prepare(self, dataframe: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Maps the client columns to the canonical fields of the schema in
+        config.json and coerces their types, as the checkpointed stage
+        "prepare"
+
+        The failures and the memory report of the coercion are kept in
+        preparation, also when the stage is resumed.
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal as delivered by the client, defaults to the loaded
+            data
+
+        Returns
+        -------
+        pd.DataFrame
+            The journal with the canonical columns
+
+        Raises
+        ------
+        KeyError
+            If config.json has no schema
+        """
+        digest = fingerprint(dataframe) if dataframe is not None else self.digest()
+        if dataframe is None:
+            dataframe = self.df
+
+        self.preparation = JBPreparation(self.reporter, self.config)
+        self.preparation.log = self.log
+        return self._run_scenario_stage(
+            "prepare",
+            self.preparation,
+            lambda: self.preparation.prepare_data(dataframe),
+            digest,
+            self.config.get("schema"),
+        )
+
+    def run_scenarios(
+        self,
+        scenarios: dict,
+        dataframe: pd.DataFrame = None,
+        report: bool = True,
+        progress: Progress = None,
+        max_workers: int = 1,
+        digest: str = None,
+    ) -> dict:
+        """
+        Runs and reports the scenarios as checkpointed stages
+
+        A re-run after a crash, e.g. in a reporter, skips every scenario that
+        completed with the same data and parameters, see
+        JournalEntryTests.params. The data is hashed once for all scenarios,
+        the loaded data once until it is replaced, see digest. The reports
+        are created on every run, since a figure shown before is not shown
+        again; the figure cache of the reporter makes them cheap.
+
+        Parameters
+        ----------
+        scenarios : dict[str, JournalEntryTests]
+            The scenarios by unique name
+        dataframe : pd.DataFrame
+            The prepared journal, defaults to the loaded data
+        report : bool
+            Whether to create the report of every scenario
+        progress : Progress
+            Advanced per scenario, cancellation keeps the checkpoints of the
+            completed scenarios; chunked scenarios such as JBTiming and
+            JBKeywords also report their rows and stop within the scenario
+        max_workers : int
+            The number of scenarios run in parallel; parallel scenarios are
+            admitted within the memory budget of config.json
+            ("memory_budget", e.g. "16G"), the reports are created in order
+            afterwards
+        digest : str
+            The content hash of dataframe, computed if not given
+
+        Returns
+        -------
+        dict
+            The scenario results by name
+        """
+        if digest is None:
+            digest = fingerprint(dataframe) if dataframe is not None else self.digest()
+        if dataframe is None:
+            dataframe = self.df
+
+        if progress is not None:
+            progress.start("run_scenarios", len(scenarios), unit="scenarios")
+
+        def run(name, scenario):
+            scenario.log = self.log
+            if progress is not None:
+                # chunked scenarios report their rows on a progress of their
+                # own, sharing the callback and the cancellation token
+                scenario.progress = Progress(
+                    progress.callback, progress.token, progress.interval
+                )
+
+            def stage():
+                scenario.prepare_data(dataframe)
+                return scenario.run_test_scenario()
+
+            # e.g. the line flags of JBUserActivity are restored on resume
+            with self.log.timer("run_scenario", scenario=name):
+                scenario.result = self._run_scenario_stage(
+                    f"{name}:run",
+                    scenario,
+                    stage,
+                    digest,
+                    type(scenario).__name__,
+                    scenario.params(),
+                )
+            self.log.summary(name, rows=_rows(scenario.result))
+            return scenario.result
+
+        if max_workers > 1:
+            scheduler = ScenarioScheduler(
+                self.config.get("memory_budget", "4G"), max_workers
+            )
+            results = scheduler.run(scenarios, run, len(dataframe), progress)
+        else:
+            results = {}
+            for name, scenario in scenarios.items():
+                results[name] = run(name, scenario)
+                if progress is not None:
+                    progress.advance(1)
+
+        if report:
+            for name, scenario in scenarios.items():
+                with self.log.timer("create_report", scenario=name):
+                    scenario.create_report()
+
+        if progress is not None:
+            progress.finish()
+        self.log.flush()
+        return results
+
+    def build_indexes(
+        self,
+        columns: list = ("account", "user", "company", "period"),
+        persist: bool = True,
+        progress: Progress = None,
+    ) -> dict:
+        """
+        Builds the secondary indexes used by query
+
+        Indexes persisted in the indexes directory of the engagement are
+        reused as long as the content of their column is unchanged.
+        Columns that are not in the data are skipped.
+
+        Parameters
+        ----------
+        columns : list
+            The columns to index
+        persist : bool
+            Whether to save newly built indexes to the engagement directory
+        progress : Progress
+            Advanced per column, cancellation leaves the completed indexes
+            in place
+
+        Returns
+        -------
+        dict[str, SecondaryIndex]
+            The indexes by column
+        """
+        columns = [column for column in columns if column in self.df.columns]
+        if progress is not None:
+            progress.start("build_indexes", len(columns), unit="indexes")
+
+        for column in columns:
+            self.indexes[column] = self._load_or_build_index(column, persist)
+            if progress is not None:
+                progress.advance(1)
+
+        if progress is not None:
+            progress.finish()
+        return self.indexes
+
+    def _load_or_build_index(self, column: str, persist: bool) -> SecondaryIndex:
+        path = index_path(self.path, column)
+        if os.path.exists(path):
+            index = SecondaryIndex.load(path, column)
+            if index.matches(self.df):
+                return index
+
+        index = SecondaryIndex.build(self.df, column)
+        if persist:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            index.save(path)
+        return index
+
+    def query(self, **criteria) -> pd.DataFrame:
+        """
+        Returns the rows matching all criteria
+
+        Indexed columns are resolved through their secondary index, in time
+        proportional to the matching rows; other columns are filtered on the
+        rows selected by the indexed ones.
+
+        Parameters
+        ----------
+        **criteria
+            The column names and the value, or list of values, to match
+
+        Returns
+        -------
+        pd.DataFrame
+            The matching rows in their original order
+        """
+
+        def as_list(value):
+            return value if isinstance(value, (list, tuple, set)) else [value]
+
+        indexed = [column for column in criteria if column in self.indexes]
+        if indexed:
+            positions = intersect(
+                [
+                    self.indexes[column].lookup_many(as_list(criteria[column]))
+                    for column in indexed
+                ]
+            )
+        else:
+            positions = np.arange(len(self.df))
+
+        rows = self.df.iloc[positions]
+        for column, value in criteria.items():
+            if column not in self.indexes:
+                rows = rows[rows[column].isin(as_list(value))]
+        return rows
+
+    def materialize(self, flags: FlagSet, dataframe: pd.DataFrame = None):
+        """
+        Returns the rows flagged in a flag set
+
+        Parameters
+        ----------
+        flags : FlagSet
+            The flagged rows, e.g. a combination of scenario flags
+        dataframe : pd.DataFrame
+            The journal the flags refer to, defaults to the loaded data
+
+        Returns
+        -------
+        pd.DataFrame
+            The flagged rows, ready for export_df
+
+        Raises
+        ------
+        ValueError
+            If the flag set does not cover the rows of the journal
+        """
+        if dataframe is None:
+            dataframe = self.df
+
+        if len(flags) != len(dataframe):
+            raise ValueError(
+                f"flags cover {len(flags)} rows, the journal has {len(dataframe)}"
+            )
+        return dataframe.iloc[flags.positions()]
+
+    def rank_entries(
+        self,
+        flags: dict,
+        n: int = 100,
+        partition_size: int = 1_000_000,
+        dataframe: pd.DataFrame = None,
+        progress: Progress = None,
+    ) -> pd.DataFrame:
+        """
+        Ranks the entries by their composite risk score
+
+        The weights of the flags are read from config.json ("risk_weights"),
+        e.g. {"weekend": 1, "round_amount": 2, "keywords": 3}.
+
+        Parameters
+        ----------
+        flags : dict[str, FlagSet | np.ndarray]
+            The scenario flags or per-row severities by name, e.g. from
+            JournalEntryTests.flags
+        n : int
+            The number of riskiest entries to return
+        partition_size : int
+            The number of rows scored at a time
+        dataframe : pd.DataFrame
+            The journal the flags refer to, defaults to the loaded data
+        progress : Progress
+            Advanced per scored partition
+
+        Returns
+        -------
+        pd.DataFrame
+            The n riskiest rows with a risk_score column, sorted by
+            descending score and ready for export_df and the reporters
+        """
+        if dataframe is None:
+            dataframe = self.df
+
+        if progress is not None:
+            progress.start("rank_entries", len(dataframe))
+
+        scorer = RiskScorer(self.config.get("risk_weights", {}))
+        ranking = scorer.top_n(partition_flags(flags, partition_size), n, progress)
+        if progress is not None:
+            progress.finish()
+        return dataframe.iloc[ranking["position"]].assign(
+            risk_score=ranking["risk_score"].to_numpy()
+        )
+
+    def compare(self, prior: "JETester", months: int = 12) -> PeriodComparison:
+        """
+        Compares the data with the data of the prior period
+
+        Parameters
+        ----------
+        prior : JETester
+            The journal entry test of the prior period
+        months : int
+            The number of months between the two periods
+
+        Returns
+        -------
+        PeriodComparison
+            The comparison, providing new_accounts, new_users,
+            new_account_pairs and volume_changes
+        """
+        return PeriodComparison(self.df, prior.df, months)
+
+    def sample(
+        self,
+        dataframe: pd.DataFrame,
+        method: str = "random",
+        size: int = 25,
+        seed: int = None,
+        amount_column: str = "amount",
+        bands: list = None,
+    ) -> pd.DataFrame:
+        """
+        Draws a sample of entries for follow-up testing
+
+        Only the sampled rows are copied out of the dataframe. The sample is
+        reproducible for a given seed and can be passed to export_df.
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The population to sample from
+        method : str
+            The sampling method (either 'random', 'monetary_unit' or 'stratified')
+        size : int or list[int]
+            The sample size, per stratum for stratified sampling
+        seed : int
+            The seed of the random number generator
+        amount_column : str
+            The column holding the amounts for monetary-unit and stratified sampling
+        bands : list
+            The inner amount band limits for stratified sampling
+
+        Returns
+        -------
+        pd.DataFrame
+            The sampled rows, with a stratum column for stratified sampling
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown or bands are missing for stratified sampling
+        """
+        if method == "random":
+            positions = sampling.random_sample(len(dataframe), size, seed)
+            return dataframe.iloc[positions]
+        elif method == "monetary_unit":
+            amounts = dataframe[amount_column].to_numpy(dtype="float64")
+            positions = sampling.monetary_unit_sample(amounts, size, seed)
+            return dataframe.iloc[positions]
+        elif method == "stratified":
+            if bands is None:
+                raise ValueError("bands are required for stratified sampling")
+            amounts = dataframe[amount_column].to_numpy(dtype="float64")
+            positions, strata = sampling.stratified_sample(amounts, bands, size, seed)
+            return dataframe.iloc[positions].assign(stratum=strata)
+        else:
+            raise ValueError(
+                "method must be either 'random', 'monetary_unit' or 'stratified'"
+            )
+
     def create_scatter_plot(self, df, x, y, title, color) -> None:
         context = ReportContext(df, x, y, title, color)
 
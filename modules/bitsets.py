@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# number of set bits of every byte value
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+class FlagSet:
+    """
+    A set of flagged rows stored as a packed bit array over row positions
+
+    A flag costs one bit per row instead of a filtered copy of the journal,
+    and flags combine with the bitwise operators &, |, ^, - (and not) and ~.
+    Rows are only materialized from the positions on export.
+
+    Attributes
+    ----------
+    bits : np.ndarray
+        The packed bits, little endian within a byte
+    size : int
+        The number of rows covered
+    """
+
+    def __init__(self, bits: np.ndarray, size: int):
+        self.bits = bits
+        self.size = size
+
+    def __repr__(self):
+        return f"FlagSet(size={self.size}, count={self.count()})"
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, FlagSet)
+            and self.size == other.size
+            and np.array_equal(self.bits, other.bits)
+        )
+
+    @classmethod
+    def from_mask(cls, mask) -> "FlagSet":
+        """
+        Creates the flag set of a boolean mask
+        """
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.packbits(mask, bitorder="little"), len(mask))
+
+    @classmethod
+    def from_positions(cls, positions, size: int) -> "FlagSet":
+        """
+        Creates the flag set of the row positions out of size rows
+        """
+        mask = np.zeros(size, dtype=bool)
+        mask[positions] = True
+        return cls.from_mask(mask)
+
+    @classmethod
+    def from_frame(cls, dataframe: pd.DataFrame) -> dict:
+        """
+        Creates a flag set per boolean column of a scenario result
+
+        Returns
+        -------
+        dict[str, FlagSet]
+            The flag sets by column name
+        """
+        return {
+            column: cls.from_mask(dataframe[column].to_numpy(dtype=bool))
+            for column in dataframe.columns
+            if pd.api.types.is_bool_dtype(dataframe[column])
+        }
+
+    def to_mask(self) -> np.ndarray:
+        """
+        Returns the flags as a boolean mask
+        """
+        return np.unpackbits(self.bits, count=self.size, bitorder="little").view(bool)
+
+    def slice(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns the flags of the rows start to stop as a boolean mask
+
+        Only the bytes covering the rows are unpacked, start must be a
+        multiple of 8.
+        """
+        if start % 8:
+            raise ValueError("start must be a multiple of 8")
+        stop = min(stop, self.size)
+        bits = self.bits[start // 8 : (stop + 7) // 8]
+        return np.unpackbits(bits, count=stop - start, bitorder="little").view(bool)
+
+    def positions(self) -> np.ndarray:
+        """
+        Returns the sorted positions of the flagged rows
+        """
+        return np.flatnonzero(self.to_mask())
+
+    def count(self) -> int:
+        """
+        Returns the number of flagged rows
+        """
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def any(self) -> bool:
+        return bool(self.bits.any())
+
+    def _check(self, other: "FlagSet") -> None:
+        if not isinstance(other, FlagSet):
+            raise TypeError("other must be a FlagSet")
+        if self.size != other.size:
+            raise ValueError(
+                f"FlagSets cover a different number of rows ({self.size} and {other.size})"
+            )
+
+    def __and__(self, other):
+        self._check(other)
+        return FlagSet(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        self._check(other)
+        return FlagSet(self.bits | other.bits, self.size)
+
+    def __xor__(self, other):
+        self._check(other)
+        return FlagSet(self.bits ^ other.bits, self.size)
+
+    def __sub__(self, other):
+        self._check(other)
+        return FlagSet(self.bits & ~other.bits, self.size)
+
+    def __invert__(self):
+        bits = ~self.bits
+        # clear the padding bits of the last byte
+        if self.size % 8:
+            bits[-1] &= (1 << (self.size % 8)) - 1
+        return FlagSet(bits, self.size)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modules.bitsets import FlagSet
+
+
+def fingerprint(*inputs) -> str:
+    """
+    Hashes the inputs of a stage
+
+    DataFrames and Series are hashed by content, arrays and flag sets by
+    their bytes and everything else by its JSON representation. The code of
+    a stage is not part of its fingerprint, pass a version as input where
+    a changed implementation has to invalidate the checkpoint.
+
+    Returns
+    -------
+    str
+        The hex digest of the inputs
+    """
+    digest = hashlib.sha256()
+    for value in inputs:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            columns = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+            digest.update(repr(list(columns)).encode())
+            try:
+                digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy())
+            except TypeError:
+                # unhashable cells, e.g. the keyword sets of JBKeywords
+                digest.update(pickle.dumps(value))
+        elif isinstance(value, np.ndarray):
+            digest.update(str(value.dtype).encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, FlagSet):
+            digest.update(str(value.size).encode())
+            digest.update(value.bits.tobytes())
+        elif isinstance(value, dict) and any(
+            isinstance(item, (pd.DataFrame, pd.Series, np.ndarray, FlagSet))
+            for item in value.values()
+        ):
+            for key in sorted(value):
+                digest.update(str(key).encode())
+                digest.update(fingerprint(value[key]).encode())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """
+    Checkpoints of the pipeline stages in the engagement directory
+
+    Every completed stage stores its output together with the hash of its
+    inputs. A stage whose inputs did not change since it last completed is
+    skipped and its output is read back, so that an interrupted run resumes
+    after the last completed stage. Since the output of a stage is the input
+    of the next, a change invalidates all stages downstream of it.
+
+    Attributes
+    ----------
+    path : str
+        The checkpoint directory
+    manifest : dict
+        The input hash and the output file per completed stage
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.join(path, "checkpoints")
+        self.manifest = {}
+        self._lock = threading.Lock()
+        self._stage_locks = {}
+        self._load_manifest()
+
+    def __repr__(self):
+        return f"CheckpointStore(path={self.path}, stages={len(self.manifest)})"
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    def _load_manifest(self) -> None:
+        try:
+            with open(self._manifest_path()) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def _save_manifest(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        temporary = self._manifest_path() + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temporary, self._manifest_path())
+
+    def is_valid(self, stage: str, key: str) -> bool:
+        """
+        Checks if a stage completed with the same inputs
+        """
+        entry = self.manifest.get(stage)
+        return (
+            entry is not None
+            and entry["inputs"] == key
+            and os.path.exists(os.path.join(self.path, entry["file"]))
+        )
+
+    def run(self, stage: str, function, *inputs):
+        """
+        Runs a stage unless it completed with the same inputs before
+
+        Parameters
+        ----------
+        stage : str
+            The unique name of the stage
+        function : callable
+            The stage, called with the inputs
+        *inputs
+            The inputs of the stage, hashed to validate the checkpoint
+
+        Returns
+        -------
+        Any
+            The output of the stage, read from the checkpoint if still valid
+        """
+        key = fingerprint(*inputs)
+        with self._lock:
+            stage_lock = self._stage_locks.setdefault(stage, threading.Lock())
+
+        # concurrent runs of the same stage, e.g. two clients of the journal
+        # server, wait for the first one and read its checkpoint
+        with stage_lock:
+            if self.is_valid(stage, key):
+                return pd.read_pickle(
+                    os.path.join(self.path, self.manifest[stage]["file"])
+                )
+
+            output = function(*inputs)
+            self._write(stage, key, output)
+            return output
+
+    def _write(self, stage: str, key: str, output) -> None:
+        # write the output before the manifest, so that a crash in between
+        # leaves the stage incomplete rather than pointing at a partial file
+        os.makedirs(self.path, exist_ok=True)
+        file = hashlib.sha256(stage.encode()).hexdigest()[:16] + ".pkl"
+        descriptor, temporary = tempfile.mkstemp(
+            prefix=file + ".", suffix=".tmp", dir=self.path
+        )
+        os.close(descriptor)
+        try:
+            pd.to_pickle(output, temporary)
+            os.replace(temporary, os.path.join(self.path, file))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        # stages of parallel scenarios complete from several threads
+        with self._lock:
+            self.manifest[stage] = {"inputs": key, "file": file}
+            self._save_manifest()
+
+    def invalidate(self, stage: str = None) -> None:
+        """
+        Removes the checkpoint of a stage, or of all stages if none is given
+        """
+        stages = [stage] if stage is not None else list(self.manifest)
+        for name in stages:
+            entry = self.manifest.pop(name, None)
+            if entry is not None:
+                try:
+                    os.remove(os.path.join(self.path, entry["file"]))
+                except FileNotFoundError:
+                    pass
+        self._save_manifest()
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class PeriodComparison:
+    """
+    Comparison of the current journal against the prior period
+
+    The key columns of both journals are factorized into a shared
+    dictionary once, all comparisons then work on integer codes with hash
+    based set operations and bincount aggregates instead of multi-column
+    merges of the two journals.
+
+    Attributes
+    ----------
+    current : pd.DataFrame
+        The journal of the current period
+    prior : pd.DataFrame
+        The journal of the prior period
+    months : int
+        The number of months between a month of the current period and the
+        same month of the prior period
+    """
+
+    def __init__(
+        self,
+        current: pd.DataFrame,
+        prior: pd.DataFrame,
+        months: int = 12,
+        document_column: str = "document_number",
+        account_column: str = "account",
+        user_column: str = "user",
+        date_column: str = "posting_date",
+        amount_column: str = "amount",
+    ):
+        self.current = current
+        self.prior = prior
+        self.months = months
+        self.document_column = document_column
+        self.account_column = account_column
+        self.user_column = user_column
+        self.date_column = date_column
+        self.amount_column = amount_column
+        self._codes = {}
+
+    def __repr__(self):
+        return f"PeriodComparison(current={len(self.current)}, prior={len(self.prior)})"
+
+    def codes(self, column: str) -> tuple:
+        """
+        Factorizes a column of both journals into a shared dictionary
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, pd.Index]
+            The codes of the current and the prior journal and the shared keys;
+            missing values are coded -1
+        """
+        if column not in self._codes:
+            current, current_keys = pd.factorize(self.current[column])
+            prior, prior_keys = pd.factorize(self.prior[column])
+
+            # map the prior keys into the dictionary of the current ones,
+            # appending the keys that are new in the prior period
+            current_keys, prior_keys = pd.Index(current_keys), pd.Index(prior_keys)
+            lookup = current_keys.get_indexer(prior_keys)
+            missing = lookup < 0
+            lookup[missing] = len(current_keys) + np.arange(np.count_nonzero(missing))
+            keys = current_keys.append(prior_keys[missing])
+
+            # the appended -1 keeps missing values coded -1
+            prior = np.append(lookup, -1)[prior]
+            self._codes[column] = (current, prior, keys)
+        return self._codes[column]
+
+    def new_keys(self, column: str) -> pd.Index:
+        """
+        Returns the values of a column that only occur in the current period,
+        e.g. new accounts or new users
+        """
+        current, prior, keys = self.codes(column)
+        seen = np.bincount(prior[prior >= 0], minlength=len(keys)) > 0
+        used = np.bincount(current[current >= 0], minlength=len(keys)) > 0
+        return keys[used & ~seen]
+
+    def new_accounts(self) -> pd.Index:
+        return self.new_keys(self.account_column)
+
+    def new_users(self) -> pd.Index:
+        return self.new_keys(self.user_column)
+
+    def _pair_keys(self, dataframe: pd.DataFrame, accounts: np.ndarray, n: int):
+        """
+        Returns the debit/credit account pairs posted together in a document,
+        as account codes combined into one integer per pair
+        """
+        documents, uniques = pd.factorize(dataframe[self.document_column])
+        amounts = dataframe[self.amount_column].to_numpy()
+        valid = (documents >= 0) & (accounts >= 0)
+
+        def incidence(mask):
+            # int64 counts, small types wrap around in the product and
+            # scipy drops the pairs summing to zero
+            matrix = sparse.csr_matrix(
+                (
+                    np.ones(np.count_nonzero(mask), dtype=np.int64),
+                    (documents[mask], accounts[mask]),
+                ),
+                shape=(len(uniques), n),
+            )
+            # csr_matrix sums duplicate lines, binarize to count documents
+            matrix.data[:] = 1
+            return matrix
+
+        pairs = (
+            incidence(valid & (amounts > 0)).T @ incidence(valid & (amounts < 0))
+        ).tocoo()
+        return pairs.row.astype(np.int64) * n + pairs.col
+
+    def new_account_pairs(self) -> pd.DataFrame:
+        """
+        Returns the debit/credit account combinations that only occur in the
+        current period
+
+        Returns
+        -------
+        pd.DataFrame
+            The columns debit_account and credit_account
+        """
+        current, prior, keys = self.codes(self.account_column)
+        n = len(keys)
+        current_pairs = self._pair_keys(self.current, current, n)
+        prior_pairs = self._pair_keys(self.prior, prior, n)
+
+        new = current_pairs[~pd.Index(current_pairs).isin(prior_pairs)]
+        return pd.DataFrame(
+            {
+                "debit_account": keys.take(new // n),
+                "credit_account": keys.take(new % n),
+            }
+        )
+
+    def _monthly(
+        self, dataframe: pd.DataFrame, accounts: np.ndarray, first: int, shape: tuple
+    ) -> tuple:
+        """
+        Aggregates the line count and the absolute amount per account and
+        month, as dense account x month arrays starting at the month first
+        """
+        n = shape[1]
+        months = (
+            pd.to_datetime(dataframe[self.date_column])
+            .to_numpy(dtype="datetime64[M]")
+            .astype(np.int64)
+            - first
+        )
+        valid = (accounts >= 0) & (months >= 0) & (months < n)
+        cells = accounts[valid] * n + months[valid]
+        amounts = np.abs(dataframe[self.amount_column].to_numpy(dtype=np.float64))
+        size = shape[0] * n
+        return (
+            np.bincount(cells, minlength=size).reshape(shape),
+            np.bincount(
+                cells, weights=np.nan_to_num(amounts[valid]), minlength=size
+            ).reshape(shape),
+        )
+
+    def volume_changes(self, threshold: float = 0.5) -> pd.DataFrame:
+        """
+        Compares the posting volume per account and month with the same month
+        of the prior period
+
+        Parameters
+        ----------
+        threshold : float
+            The minimum relative change of the line count or the amount to be
+            reported, 0.5 reports changes of 50% and more
+
+        Returns
+        -------
+        pd.DataFrame
+            The columns account, month, current_count, prior_count,
+            current_amount, prior_amount, count_change and amount_change;
+            changes from zero are infinite
+        """
+        current, prior, keys = self.codes(self.account_column)
+        dates = pd.to_datetime(self.current[self.date_column]).to_numpy(
+            dtype="datetime64[M]"
+        )
+        dates = dates[~np.isnat(dates)]
+        if not len(dates):
+            return pd.DataFrame()
+        first = dates.min().astype(np.int64)
+        n = int(dates.max().astype(np.int64) - first) + 1
+
+        shape = (len(keys), n)
+        current_count, current_amount = self._monthly(
+            self.current, current, first, shape
+        )
+        prior_count, prior_amount = self._monthly(
+            self.prior, prior, first - self.months, shape
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            count_change = current_count / prior_count - 1
+            amount_change = current_amount / prior_amount - 1
+
+        changed = (np.abs(count_change) >= threshold) | (
+            np.abs(amount_change) >= threshold
+        )
+        changed &= (current_count > 0) | (prior_count > 0)
+        account, month = np.nonzero(changed)
+
+        return pd.DataFrame(
+            {
+                "account": keys.take(account),
+                "month": (month + first).astype("datetime64[M]"),
+                "current_count": current_count[account, month],
+                "prior_count": prior_count[account, month],
+                "current_amount": current_amount[account, month],
+                "prior_amount": prior_amount[account, month],
+                "count_change": count_change[account, month],
+                "amount_change": amount_change[account, month],
+            }
+        )
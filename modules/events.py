@@ -0,0 +1,262 @@
+import contextlib
+import glob
+import json
+import multiprocessing.util
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# the directory of the event log is inherited by worker processes, which
+# write to their own file next to the one of the main process
+ENVIRONMENT_VARIABLE = "JET_EVENT_LOG"
+LOG_DIRECTORY = "logs"
+
+
+# the event logs of the process, whose locks are replaced in a forked child
+_logs = weakref.WeakSet()
+
+
+def _after_fork() -> None:
+    # a lock may have been held by another thread of the parent
+    for event_log in list(_logs):
+        event_log._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+class EventLog:
+    """
+    A structured log of events, counters and timers
+
+    Events are buffered in memory and appended in batches to a JSON lines
+    file per process in the log directory, so that the main process and
+    its workers never write to the same file. Counters are aggregated in
+    memory and written as the increments since the last flush, which keeps
+    counting per chunk cheap. The buffer is flushed when it holds
+    batch_size events and when the process exits, including worker
+    processes of multiprocessing and concurrent.futures. Without a log
+    directory the newest events are kept, at most batch_size, until one is
+    configured.
+
+    Every event has the fields time, pid and event, plus the fields it was
+    emitted with, e.g.
+
+    {"time": 1700000000.0, "pid": 4711, "event": "summary", "scenario": "JB1", "rows": 12}
+
+    Attributes
+    ----------
+    directory : str
+        The log directory, None to keep the newest events in memory until a
+        directory is configured
+    batch_size : int
+        The number of buffered events that triggers a flush
+    echo : bool
+        Whether messages are also printed to the console
+    """
+
+    def __init__(
+        self, directory: str = None, batch_size: int = 1000, echo: bool = True
+    ):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.echo = echo
+        self._lock = threading.Lock()
+        self._pid = None
+        self._buffer = []
+        self._counters = {}
+        self._flushed = {}
+        _logs.add(self)
+
+    def __repr__(self):
+        return f"EventLog(directory={self.directory}, buffered={len(self._buffer)})"
+
+    def configure(self, directory: str, echo: bool = None) -> None:
+        """
+        Sets the log directory, for this process and its worker processes
+        """
+        self.directory = directory
+        os.environ[ENVIRONMENT_VARIABLE] = directory
+        if echo is not None:
+            self.echo = echo
+
+    def configure_default(self, directory: str) -> None:
+        """
+        Sets the log directory unless this process or its parent configured
+        one, so that the first engagement does not give way to later ones
+        """
+        if self.directory is None and ENVIRONMENT_VARIABLE not in os.environ:
+            self.configure(directory)
+
+    def _check_process(self) -> None:
+        # a forked worker inherits the buffer of its parent, which the parent
+        # writes itself; the worker starts empty and flushes on its exit
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._buffer, self._counters, self._flushed = [], {}, {}
+            multiprocessing.util.Finalize(self, self.flush, exitpriority=10)
+
+    def emit(self, event: str, **fields) -> None:
+        """
+        Records an event with arbitrary JSON serializable fields
+        """
+        record = {"time": time.time(), "pid": os.getpid(), "event": event, **fields}
+        with self._lock:
+            self._check_process()
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Increments a counter, e.g. the number of processed rows
+        """
+        with self._lock:
+            self._check_process()
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def message(self, text: str, **fields) -> None:
+        """
+        Records a message, printed to the console as well if echo is set
+        """
+        self.emit("message", text=text, **fields)
+        if self.echo:
+            print(text)
+
+    def summary(self, scenario: str, **fields) -> None:
+        """
+        Records the summary of a scenario result, e.g. its number of rows
+        """
+        self.emit("summary", scenario=scenario, **fields)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **fields):
+        """
+        Records the wall clock seconds of the enclosed block, also if it
+        raised
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.emit("timer", name=name, seconds=time.perf_counter() - start, **fields)
+
+    def counters(self) -> dict:
+        """
+        Returns the counters of this process
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def path(self) -> str:
+        """
+        Returns the log file of this process, None without a log directory
+        """
+        directory = self.directory or os.environ.get(ENVIRONMENT_VARIABLE)
+        if directory is None:
+            return None
+        return os.path.join(directory, f"events-{os.getpid()}.jsonl")
+
+    def flush(self) -> None:
+        """
+        Appends the buffered events and the counter increments to the log
+        file of this process; without a log directory they stay buffered and
+        the older half of a full buffer is dropped
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            path = self.path()
+            if path is None:
+                if len(self._buffer) >= self.batch_size:
+                    del self._buffer[: len(self._buffer) - self.batch_size // 2]
+                return
+
+            records = list(self._buffer)
+            now = time.time()
+            for name, value in self._counters.items():
+                increment = value - self._flushed.get(name, 0)
+                if increment:
+                    records.append(
+                        {
+                            "time": now,
+                            "pid": self._pid,
+                            "event": "counter",
+                            "name": name,
+                            "value": increment,
+                        }
+                    )
+            if not records:
+                return
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a") as f:
+                f.write(
+                    "".join(
+                        json.dumps(record, default=_json_default) + "\n"
+                        for record in records
+                    )
+                )
+            self._buffer = []
+            self._flushed = dict(self._counters)
+
+
+def read_events(directory: str) -> pd.DataFrame:
+    """
+    Reads the events of all processes from a log directory
+
+    Returns
+    -------
+    pd.DataFrame
+        The events ordered by time, with a column per field
+    """
+    records = []
+    for path in glob.glob(os.path.join(directory, "events-*.jsonl")):
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    if not records:
+        return pd.DataFrame(columns=["time", "pid", "event"])
+    return pd.DataFrame(records).sort_values("time", kind="stable", ignore_index=True)
+
+
+def read_counters(directory: str) -> dict:
+    """
+    Returns the counters of all processes from a log directory
+    """
+    events = read_events(directory)
+    counters = events[events["event"] == "counter"]
+    if counters.empty:
+        return {}
+    return counters.groupby("name")["value"].sum().to_dict()
+
+
+def configure(directory: str) -> None:
+    """
+    Sets the directory of the event log of the process, e.g. as initializer
+    of the worker processes of an engagement; None keeps the inherited one
+    """
+    if directory is not None:
+        log.configure(directory)
+
+
+# the event log of the process, configured by the entry point, see main.py,
+# or else with the directory of the first engagement; scenarios and imports
+# log to the event log of their engagement
+log = EventLog()
@@ -0,0 +1,410 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from modules import schema
+from modules import events
+from modules.events import EventLog, log
+from modules.progress import Progress
+
+# the import section in config.json lists the extracts delivered by the
+# client, relative to the engagement directory, e.g.
+#
+# "import": {
+#     "sources": [
+#         {"pattern": "extracts/*.csv", "options": {"sep": ";", "encoding": "latin-1"}},
+#         {"pattern": "extracts/*.xlsx", "options": {"sheet_name": "Journal"}},
+#         {"pattern": "extracts/*.txt", "format": "fixed_width",
+#          "options": {"colspecs": [[0, 10], [10, 20]], "names": ["Belegnummer", "Betrag"]}}
+#     ],
+#     "chunksize": 500000
+# }
+#
+# the columns are mapped and typed with the schema, see modules.schema
+
+FORMATS = {
+    ".csv": "csv",
+    ".tsv": "csv",
+    ".xlsx": "excel",
+    ".xlsm": "excel",
+    ".xls": "excel",
+    ".txt": "fixed_width",
+    ".dat": "fixed_width",
+}
+
+JOURNAL_FILE = "journal.parquet"
+MANIFEST_FILE = "manifest.json"
+
+
+def source_format(file: str, source: dict) -> str:
+    """
+    Returns the format of a source file, configured or by its extension
+
+    Raises
+    ------
+    ValueError
+        If the format is unknown
+    """
+    format = source.get("format") or FORMATS.get(os.path.splitext(file)[1].lower())
+    if format not in ("csv", "excel", "fixed_width"):
+        raise ValueError(
+            f"format of {file} must be one of csv, excel or fixed_width, "
+            "configure it in the import sources"
+        )
+    return format
+
+
+def _excel_parquet(file: str, options: dict, cache: str) -> str:
+    """
+    Converts the sheet of a workbook to parquet once
+
+    The converted file is keyed by the path, size and modification time of
+    the workbook and the read options, so a workbook is parsed again only
+    if it changed.
+    """
+    stat = os.stat(file)
+    key = hashlib.sha256(
+        json.dumps(
+            [os.path.abspath(file), stat.st_size, stat.st_mtime_ns, options],
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()[:16]
+    target = os.path.join(
+        cache, f"{os.path.splitext(os.path.basename(file))[0]}-{key}.parquet"
+    )
+
+    if not os.path.exists(target):
+        dataframe = pd.read_excel(file, **options)
+        # mixed text and numbers have no parquet type, dates and amounts
+        # stored as such by Excel keep their type
+        for column in dataframe.columns[dataframe.dtypes == object]:
+            dataframe[column] = dataframe[column].astype("string")
+        temporary = target + ".tmp"
+        dataframe.to_parquet(temporary, index=False)
+        os.replace(temporary, target)
+    return target
+
+
+def _chunks(file: str, format: str, options: dict, columns: list, chunksize: int):
+    """
+    Yields the schema columns of a source file in chunks of chunksize rows,
+    read as text; the types are converted by schema.coerce
+    """
+    if format == "csv":
+        yield from pd.read_csv(
+            file, usecols=columns, dtype=str, chunksize=chunksize, **options
+        )
+    elif format == "fixed_width":
+        yield from pd.read_fwf(
+            file, usecols=columns, dtype=str, chunksize=chunksize, **options
+        )
+    else:
+        batches = pq.ParquetFile(file).iter_batches(
+            batch_size=chunksize, columns=columns
+        )
+        for batch in batches:
+            yield batch.to_pandas()
+
+
+def _to_table(dataframe: pd.DataFrame, column_schema: dict, arrow_schema=None):
+    """
+    Converts a coerced chunk to an Arrow table
+
+    The categories of the code fields differ between chunks, so codes are
+    written as plain strings and all chunks share the schema of the first.
+    """
+    dataframe = dataframe.copy(deep=False)
+    for spec in column_schema.values():
+        if spec["type"] == "code":
+            dataframe[spec["field"]] = dataframe[spec["field"]].astype(object)
+
+    if arrow_schema is None:
+        arrow_schema = pa.Schema.from_pandas(dataframe, preserve_index=False)
+        for spec in column_schema.values():
+            if spec["type"] == "code":
+                position = arrow_schema.get_field_index(spec["field"])
+                arrow_schema = arrow_schema.set(
+                    position, pa.field(spec["field"], pa.string())
+                )
+    return pa.Table.from_pandas(dataframe, schema=arrow_schema, preserve_index=False)
+
+
+def import_source(
+    file: str,
+    format: str,
+    options: dict,
+    column_schema: dict,
+    part: str,
+    chunksize: int = 500_000,
+    cache: str = None,
+    event_log: EventLog = None,
+) -> dict:
+    """
+    Imports a single source file into a parquet part of the journal
+
+    Runs in a worker process; the chunks are coerced to the canonical fields
+    one at a time and appended to the part, so that only one chunk of the
+    file is held in memory. The rows are counted in event_log, by default
+    the event log of the process.
+
+    Returns
+    -------
+    dict
+        The control totals of the file: the number of rows, the total per
+        amount field, the range per date field and the number of values
+        that failed coercion per field
+
+    Raises
+    ------
+    ImportError
+        If pyarrow is not installed
+    """
+    if pa is None:
+        raise ImportError("Dependency pyarrow not installed")
+    if event_log is None:
+        event_log = log
+
+    if format == "excel":
+        file_to_read = _excel_parquet(file, options, cache)
+        options = {}
+    else:
+        file_to_read = file
+
+    totals = {
+        spec["field"]: 0.0
+        for spec in column_schema.values()
+        if spec["type"] == "amount"
+    }
+    dates = {
+        spec["field"]: [None, None]
+        for spec in column_schema.values()
+        if spec["type"] == "date"
+    }
+    failures = {spec["field"]: 0 for spec in column_schema.values()}
+    rows, writer = 0, None
+
+    try:
+        for chunk in _chunks(
+            file_to_read, format, options, list(column_schema), chunksize
+        ):
+            prepared, failed = schema.coerce(chunk, column_schema)
+            rows += len(prepared)
+            event_log.count("import_rows", len(prepared))
+            for field in totals:
+                totals[field] += float(prepared[field].sum())
+            for field, (first, last) in dates.items():
+                values = prepared[field].dropna()
+                if len(values):
+                    dates[field] = [
+                        min(first, values.min()) if first is not None else values.min(),
+                        max(last, values.max()) if last is not None else values.max(),
+                    ]
+            for field, positions in failed.items():
+                failures[field] += len(positions)
+
+            table = _to_table(
+                prepared, column_schema, writer.schema if writer else None
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(part, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    event_log.count("import_files")
+
+    return {
+        "file": file,
+        "format": format,
+        "rows": rows,
+        "totals": totals,
+        "dates": {
+            field: [value.isoformat() if value is not None else None for value in span]
+            for field, span in dates.items()
+        },
+        "failures": failures,
+    }
+
+
+class JournalImporter:
+    """
+    Imports the general ledger extracts of a client into the columnar
+    journal consumed by JETester
+
+    The source files are read in parallel worker processes, in chunks and
+    as text, mapped and typed with the schema in config.json and written to
+    journal.parquet in the engagement directory. Workbooks are converted to
+    parquet once and read from there on later imports. The control totals
+    of every file are written to the import manifest for the JB0
+    reconciliation.
+
+    Attributes
+    ----------
+    path : str
+        The engagement directory
+    config : dict
+        The configuration of the journal entry test, with the sections
+        "import" and "schema"
+    log : EventLog
+        The event log the imports are counted in, also by the worker
+        processes
+    """
+
+    def __init__(self, path: str, config: dict, log: EventLog = None):
+        self.path = path
+        self.config = config
+        self.log = log if log is not None else events.log
+        self.directory = os.path.join(path, "imports")
+
+    def __repr__(self):
+        return f"JournalImporter(path={self.path})"
+
+    def sources(self) -> list:
+        """
+        Returns the source files with their format and read options, in the
+        order of the configured patterns
+
+        Raises
+        ------
+        KeyError
+            If config.json has no import sources
+        FileNotFoundError
+            If a pattern matches no file
+        """
+        if "sources" not in self.config.get("import", {}):
+            raise KeyError("import sources not found in config.json")
+
+        files = []
+        for source in self.config["import"]["sources"]:
+            matches = sorted(glob.glob(os.path.join(self.path, source["pattern"])))
+            if not matches:
+                raise FileNotFoundError(
+                    f"No source file matches {source['pattern']} in {self.path}"
+                )
+            for file in matches:
+                files.append(
+                    (file, source_format(file, source), source.get("options", {}))
+                )
+        return files
+
+    def run(self, max_workers: int = 4, progress: Progress = None) -> tuple:
+        """
+        Imports the source files
+
+        Parameters
+        ----------
+        max_workers : int
+            The maximum number of files read at the same time, 1 reads them
+            in the calling process
+        progress : Progress
+            Advanced per imported file with its number of rows
+
+        Returns
+        -------
+        tuple[pd.DataFrame, list[dict]]
+            The journal, with the source file of every row in the column
+            source, and the control totals per file
+        """
+        column_schema = self.config["schema"]
+        chunksize = self.config["import"].get("chunksize", 500_000)
+        files = self.sources()
+        parts = os.path.join(self.directory, "parts")
+        cache = os.path.join(self.directory, "excel")
+        os.makedirs(parts, exist_ok=True)
+        os.makedirs(cache, exist_ok=True)
+
+        if progress is not None:
+            progress.start("import", len(files), unit="files")
+
+        jobs = [
+            (
+                file,
+                format,
+                options,
+                column_schema,
+                os.path.join(parts, f"{number:05d}.parquet"),
+                chunksize,
+                cache,
+            )
+            for number, (file, format, options) in enumerate(files)
+        ]
+        summaries = {}
+        if max_workers == 1:
+            for job in jobs:
+                summaries[job[4]] = import_source(*job, self.log)
+                if progress is not None:
+                    progress.advance(1)
+        else:
+            # the workers log to the directory of the event log
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=events.configure,
+                initargs=(self.log.directory,),
+            ) as executor:
+                futures = {executor.submit(import_source, *job): job for job in jobs}
+                for future in as_completed(futures):
+                    summaries[futures[future][4]] = future.result()
+                    if progress is not None:
+                        progress.advance(1)
+
+        journal = self._combine([job[4] for job in jobs], summaries, column_schema)
+        manifest = [summaries[job[4]] for job in jobs]
+        for summary in manifest:
+            summary["file"] = os.path.relpath(summary["file"], self.path)
+
+        journal.to_parquet(os.path.join(self.path, JOURNAL_FILE), index=False)
+        with open(os.path.join(self.directory, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(parts)
+
+        if progress is not None:
+            progress.finish()
+        return journal, manifest
+
+    def _combine(self, parts: list, summaries: dict, column_schema: dict):
+        """
+        Concatenates the parts in the order of the sources, with the
+        categories of the code fields unified across the files
+        """
+        frames = []
+        for part in parts:
+            if summaries[part]["rows"]:
+                frame = pd.read_parquet(part)
+                frame["source"] = os.path.relpath(summaries[part]["file"], self.path)
+                frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(
+                columns=[spec["field"] for spec in column_schema.values()]
+            )
+
+        journal = pd.concat(frames, ignore_index=True)
+        for spec in column_schema.values():
+            if spec["type"] == "code":
+                journal[spec["field"]] = journal[spec["field"]].astype("category")
+        journal["source"] = journal["source"].astype("category")
+        return journal
+
+    def manifest(self) -> list:
+        """
+        Returns the control totals per file of the last import
+
+        Raises
+        ------
+        FileNotFoundError
+            If no import was run in the engagement directory
+        """
+        with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+            return json.load(f)
@@ -0,0 +1,188 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.checkpoints import fingerprint
+
+
+class SecondaryIndex:
+    """
+    A secondary index over one column of the journal
+
+    The row positions are kept as a permutation sorted by key, with an offset
+    table per key, so that all rows of a key are a contiguous slice of the
+    permutation. A lookup costs a hash lookup of the key plus the size of
+    the result, independent of the number of rows.
+
+    Attributes
+    ----------
+    column : str
+        The indexed column
+    keys : pd.Index
+        The distinct values of the column, missing values are not indexed
+    order : np.ndarray
+        The row positions sorted by key, ascending within a key
+    offsets : np.ndarray
+        The start of every key in order, with the total as last element
+    rows : int
+        The number of rows of the indexed dataframe
+    digest : str
+        The content hash of the indexed column, see checkpoints.fingerprint
+    """
+
+    def __init__(
+        self,
+        column: str,
+        keys: pd.Index,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        rows: int,
+        digest: str = None,
+    ):
+        self.column = column
+        self.keys = keys
+        self.order = order
+        self.offsets = offsets
+        self.rows = rows
+        self.digest = digest
+
+    def __repr__(self):
+        return f"SecondaryIndex(column={self.column}, keys={len(self.keys)})"
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, dataframe: pd.DataFrame, column: str) -> "SecondaryIndex":
+        """
+        Builds the index of a column
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal
+        column : str
+            The column to index
+
+        Returns
+        -------
+        SecondaryIndex
+            The index of the column
+        """
+        codes, keys = pd.factorize(dataframe[column])
+        counts = np.bincount(codes[codes >= 0], minlength=len(keys))
+        # missing values sort behind all keys and are cut off
+        codes = np.where(codes < 0, len(keys), codes)
+        order = np.argsort(codes, kind="stable")[: counts.sum()]
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        return cls(
+            column,
+            pd.Index(keys),
+            order,
+            offsets,
+            len(dataframe),
+            fingerprint(dataframe[column]),
+        )
+
+    def matches(self, dataframe: pd.DataFrame) -> bool:
+        """
+        Checks if the index was built from the same content of the column,
+        e.g. before reusing a persisted index
+        """
+        return (
+            self.digest is not None
+            and self.rows == len(dataframe)
+            and self.digest == fingerprint(dataframe[self.column])
+        )
+
+    def lookup(self, key) -> np.ndarray:
+        """
+        Returns the sorted row positions of a key, empty if the key is unknown
+        """
+        try:
+            code = self.keys.get_loc(key)
+        except KeyError:
+            return self.order[:0]
+        return self.order[self.offsets[code] : self.offsets[code + 1]]
+
+    def lookup_many(self, keys: list) -> np.ndarray:
+        """
+        Returns the sorted row positions of any of the keys, each row once
+        """
+        codes = self.keys.get_indexer(pd.Index(list(keys), dtype=object))
+        codes = np.unique(codes[codes >= 0])
+        if not len(codes):
+            return self.order[:0]
+        return np.sort(
+            np.concatenate(
+                [
+                    self.order[self.offsets[code] : self.offsets[code + 1]]
+                    for code in codes
+                ]
+            )
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Saves the index to a .npz file
+        """
+        # write to a temporary file first, an interrupted save must not
+        # leave a truncated index behind
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez(
+                f,
+                keys=np.asarray(self.keys, dtype=object),
+                order=self.order,
+                offsets=self.offsets,
+                rows=self.rows,
+                digest=self.digest or "",
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, column: str) -> "SecondaryIndex":
+        """
+        Loads an index saved with save; indexes saved without a digest have
+        to be rebuilt, see matches
+
+        Raises
+        ------
+        FileNotFoundError
+            If the index file is not found
+        """
+        with np.load(path, allow_pickle=True) as stored:
+            return cls(
+                column,
+                pd.Index(stored["keys"]),
+                stored["order"],
+                stored["offsets"],
+                int(stored["rows"]),
+                (str(stored["digest"]) or None) if "digest" in stored else None,
+            )
+
+
+def index_path(path: str, column: str) -> str:
+    """
+    Returns the path of the index file of a column in the engagement directory
+    """
+    return os.path.join(path, "indexes", f"{column}.npz")
+
+
+def intersect(positions: list) -> np.ndarray:
+    """
+    Intersects sorted, unique row position arrays, smallest first
+    """
+    positions = sorted(positions, key=len)
+    result = positions[0]
+    for other in positions[1:]:
+        if not len(result):
+            break
+        if not len(other):
+            return other
+        # binary search of the smaller array in the larger one
+        found = np.searchsorted(other, result).clip(max=len(other) - 1)
+        result = result[other[found] == result]
+    return result
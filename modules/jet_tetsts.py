@@ -1,11 +1,52 @@
 # create an abstract class to describe the interface of a JET
 
+import inspect
 from abc import ABC, abstractmethod
 
+import numpy as np
 import pandas as pd
+from scipy import sparse
 
+from helpers.aho_corasick import KeywordAutomaton
+from modules import schema
+from modules.bitsets import FlagSet
+from modules import events
 from reports.reports import Report, ReportContext
 
+_NANOSECONDS_PER_DAY = 86_400 * 10**9
+
+
+def _to_day_numbers(dates: list) -> np.ndarray:
+    """
+    Converts a list of ISO dates to day numbers since the epoch
+    """
+    return np.array(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def _to_integers(values: pd.Series) -> pd.Series:
+    """
+    Parses whole numbers exactly to Int64, without a detour over float64
+
+    Numbers with a fraction, e.g. "10.5", and anything else that is no whole
+    number become missing; "10.0" counts as whole.
+    """
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype("Int64")
+    if pd.api.types.is_float_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            whole = (
+                np.isfinite(numbers)
+                & (numbers == np.floor(numbers))
+                & (np.abs(numbers) < 2.0**63)
+            )
+        integers = np.where(whole, numbers, 0).astype(np.int64)
+        return pd.Series(integers, index=values.index).astype("Int64").where(whole)
+
+    # at most 18 digits fit into int64 in any case
+    text = values.astype("string").str.strip()
+    return text.str.extract(r"^([+-]?\d{1,18})(?:\.0*)?$", expand=False).astype("Int64")
+
 
 class ScenarioContext:
     def __init__(self, name, description):
@@ -14,12 +55,27 @@ class ScenarioContext:
 
 
 class JournalEntryTests(ABC):
+    # peak memory of a scenario in bytes per journal row plus a fixed part,
+    # scenarios override these with their own figures
+    memory_per_row = 64
+    memory_fixed = 0
+    # the progress of a running scenario, set by JETester.run_scenarios, and
+    # the number of items per chunk of the chunked scenarios
+    progress = None
+    chunk_size = 1_000_000
+    # the event log of the engagement, set by JETester.run_scenarios, and
+    # else the event log of the process
+    log = events.log
+    # the attributes besides the result that JETester.run_scenarios saves in
+    # the checkpoint of a scenario and restores on a resumed run
+    checkpointed = ()
+
     @abstractmethod
     def prepare_data(self):
         pass
 
     @abstractmethod
-    def run_test_scenarios(self):
+    def run_test_scenario(self):
         pass
 
     @abstractmethod
@@ -30,180 +86,1205 @@ class JournalEntryTests(ABC):
     def export_data(self):
         pass
 
+    def estimate_memory(self, rows: int) -> int:
+        """
+        Estimates the peak memory of the scenario in bytes
+
+        Parameters
+        ----------
+        rows : int
+            The number of rows of the journal
+
+        Returns
+        -------
+        int
+            The estimated peak memory in bytes
+        """
+        return self.memory_fixed + self.memory_per_row * rows
+
+    def _chunks(self, n: int, task: str, unit: str = "rows"):
+        """
+        Yields the slices of n items in chunks of chunk_size, reporting the
+        progress and checking for cancellation after every chunk
+
+        Raises
+        ------
+        OperationCancelled
+            If the cancellation was requested
+        """
+        if self.progress is not None:
+            self.progress.start(task, n, unit)
+        for start in range(0, n, self.chunk_size):
+            stop = min(start + self.chunk_size, n)
+            yield slice(start, stop)
+            if self.progress is not None:
+                self.progress.advance(stop - start)
+        if self.progress is not None:
+            self.progress.finish()
+
+    def params(self) -> dict:
+        """
+        Returns the constructor arguments of the scenario except the
+        reporter, e.g. to tell checkpoints of differently configured runs
+        apart
+
+        Returns
+        -------
+        dict
+            The arguments by name, as stored on the scenario
+        """
+        signature = inspect.signature(type(self).__init__)
+        return {
+            name: getattr(self, name, None)
+            for name, parameter in signature.parameters.items()
+            if name not in ("self", "reporter")
+            and parameter.kind not in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD)
+        }
+
+    def flags(self) -> dict:
+        """
+        Returns the boolean columns of the scenario result as flag sets
+
+        Returns
+        -------
+        dict[str, FlagSet]
+            The flag sets by column name, empty if the scenario has no
+            tabular result
+        """
+        result = getattr(self, "result", None)
+        if isinstance(result, pd.DataFrame):
+            return FlagSet.from_frame(result)
+        return {}
+
 
 class JBPreparation(JournalEntryTests):
-    def __init__(self, reporter: Report):
-        self.reporter = reporter
+    checkpointed = ("failures", "memory_before", "memory_after")
 
-    def prepare_data(self):
-        print("JBpreparation: prepare data")
+    def __init__(self, reporter: Report, config: dict = None):
+        self.reporter = reporter
+        self.config = config or {}
+        self.failures = {}
+        self.memory_before = None
+        self.memory_after = None
+
+    def prepare_data(self, dataframe: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Maps the client columns to the canonical fields of the schema in
+        config.json ("schema") and coerces their types
+
+        The row positions that failed coercion are kept per field in
+        failures, the dtype and memory usage of the columns before and after
+        the coercion in memory_before and memory_after.
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal as delivered by the client
+
+        Returns
+        -------
+        pd.DataFrame
+            The journal with the canonical columns
+
+        Raises
+        ------
+        KeyError
+            If config.json has no schema
+        """
+        self.log.emit("stage", scenario="JBPreparation", stage="prepare_data")
+        if dataframe is None:
+            return None
+        if "schema" not in self.config:
+            raise KeyError("schema not found in config.json")
+
+        self.memory_before = schema.memory_report(dataframe)
+        prepared, self.failures = schema.coerce(dataframe, self.config["schema"])
+        self.memory_after = schema.memory_report(prepared)
+
+        self.log.summary(
+            "JBPreparation",
+            memory_before=int(self.memory_before["bytes"].sum()),
+            memory_after=int(self.memory_after["bytes"].sum()),
+            failures={field: len(rows) for field, rows in self.failures.items()},
+        )
+        return prepared
 
     def run_test_scenario(self):
-        print("JBpreparation: run test scenario")
+        self.log.emit("stage", scenario="JBPreparation", stage="run_test_scenario")
 
     def create_report(self, dataframe: pd.DataFrame, reporter: Report):
-        print("JBpreparation: create report")
+        self.log.emit("stage", scenario="JBPreparation", stage="create_report")
         reporter.plot_missing_values(dataframe)
 
     def export_data(self):
-        print("JBpreparation: export data")
+        self.log.emit("stage", scenario="JBPreparation", stage="export_data")
 
 
 class JB0(JournalEntryTests):
     def prepare_data(self):
-        print("JB0: prepare data")
+        self.log.emit("stage", scenario="JB0", stage="prepare_data")
 
     def print_test_scenario_context(self):
-        print(
-            f"JB0: Reconciliation of the control totals (total amount and line item count) of the Journal Entry Data file(s) provided by the engagement team during the import process and the data imported and used for journal entry analysis. For each Journal Entry Data file, the report also displays the effective and entry date ranges. This report also displays a reconciliation of the control totals (beginning and ending balances and line item count) provided during the import process for the Trial Balance Data file(s), when applicable, to the data imported and used for journal entry analysis."
+        self.log.message(
+            f"JB0: Reconciliation of the control totals (total amount and line item count) of the Journal Entry Data file(s) provided by the engagement team during the import process and the data imported and used for journal entry analysis. For each Journal Entry Data file, the report also displays the effective and entry date ranges. This report also displays a reconciliation of the control totals (beginning and ending balances and line item count) provided during the import process for the Trial Balance Data file(s), when applicable, to the data imported and used for journal entry analysis.",
+            scenario="JB0",
         )
 
     def run_test_scenario(self):
-        print("JB0: run test scenario")
+        self.log.emit("stage", scenario="JB0", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB0: report", end="\n")
-        print("")
+        self.log.emit("stage", scenario="JB0", stage="create_report")
 
     def export_data(self):
-        print("JB0: export data")
+        self.log.emit("stage", scenario="JB0", stage="export_data")
 
 
 class JB1(JournalEntryTests):
     def prepare_data(self):
-        print("JB1: prepare data")
+        self.log.emit("stage", scenario="JB1", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB1: run test scenario")
+        self.log.emit("stage", scenario="JB1", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB1: create report")
+        self.log.emit("stage", scenario="JB1", stage="create_report")
 
     def export_data(self):
-        print("JB1: export data")
+        self.log.emit("stage", scenario="JB1", stage="export_data")
 
 
 class JB2(JournalEntryTests):
     def prepare_data(self):
-        print("JB2: prepare data")
+        self.log.emit("stage", scenario="JB2", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB2: run test scenario")
+        self.log.emit("stage", scenario="JB2", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB2: create report")
+        self.log.emit("stage", scenario="JB2", stage="create_report")
 
     def export_data(self):
-        print("JB2: export data")
+        self.log.emit("stage", scenario="JB2", stage="export_data")
 
 
 class JB3(JournalEntryTests):
     def prepare_data(self):
-        print("JB3: prepare data")
+        self.log.emit("stage", scenario="JB3", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB3: run test scenario")
+        self.log.emit("stage", scenario="JB3", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB3: create report")
+        self.log.emit("stage", scenario="JB3", stage="create_report")
 
     def export_data(self):
-        print("JB3: export data")
+        self.log.emit("stage", scenario="JB3", stage="export_data")
 
 
 class JB4(JournalEntryTests):
     def prepare_data(self):
-        print("JB4: prepare data")
+        self.log.emit("stage", scenario="JB4", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB4: run test scenario")
+        self.log.emit("stage", scenario="JB4", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB4: create report")
+        self.log.emit("stage", scenario="JB4", stage="create_report")
 
     def export_data(self):
-        print("JB4: export data")
+        self.log.emit("stage", scenario="JB4", stage="export_data")
 
 
 class JB5(JournalEntryTests):
     def prepare_data(self):
-        print("JB5: prepare data")
+        self.log.emit("stage", scenario="JB5", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB5: run test scenario")
+        self.log.emit("stage", scenario="JB5", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB5: create report")
+        self.log.emit("stage", scenario="JB5", stage="create_report")
 
     def export_data(self):
-        print("JB5: export data")
+        self.log.emit("stage", scenario="JB5", stage="export_data")
 
 
 class JB6(JournalEntryTests):
     def prepare_data(self):
-        print("JB6: prepare data")
+        self.log.emit("stage", scenario="JB6", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB6: run test scenario")
+        self.log.emit("stage", scenario="JB6", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB6: create report")
+        self.log.emit("stage", scenario="JB6", stage="create_report")
 
     def export_data(self):
-        print("JB6: export data")
+        self.log.emit("stage", scenario="JB6", stage="export_data")
 
 
 class JB7(JournalEntryTests):
     def prepare_data(self):
-        print("JB7: prepare data")
+        self.log.emit("stage", scenario="JB7", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB7: run test scenario")
+        self.log.emit("stage", scenario="JB7", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB7: create report")
+        self.log.emit("stage", scenario="JB7", stage="create_report")
 
     def export_data(self):
-        print("JB7: export data")
+        self.log.emit("stage", scenario="JB7", stage="export_data")
 
 
 class JB8(JournalEntryTests):
     def prepare_data(self):
-        print("JB8: prepare data")
+        self.log.emit("stage", scenario="JB8", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB8: run test scenario")
+        self.log.emit("stage", scenario="JB8", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB8: create report")
+        self.log.emit("stage", scenario="JB8", stage="create_report")
 
     def export_data(self):
-        print("JB8: export data")
+        self.log.emit("stage", scenario="JB8", stage="export_data")
 
 
 class JB9(JournalEntryTests):
     def prepare_data(self):
-        print("JB9: prepare data")
+        self.log.emit("stage", scenario="JB9", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB9: run test scenario")
+        self.log.emit("stage", scenario="JB9", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB9: create report")
+        self.log.emit("stage", scenario="JB9", stage="create_report")
 
     def export_data(self):
-        print("JB9: export data")
+        self.log.emit("stage", scenario="JB9", stage="export_data")
 
 
 class JB10(JournalEntryTests):
     def prepare_data(self):
-        print("JB10: prepare data")
+        self.log.emit("stage", scenario="JB10", stage="prepare_data")
 
     def run_test_scenario(self):
-        print("JB10: run test scenario")
+        self.log.emit("stage", scenario="JB10", stage="run_test_scenario")
 
     def create_report(self):
-        print("JB10: create report")
+        self.log.emit("stage", scenario="JB10", stage="create_report")
 
     def export_data(self):
-        print("JB10: export data")
+        self.log.emit("stage", scenario="JB10", stage="export_data")
+
+
+class JBAccountPairs(JournalEntryTests):
+    """
+    Debit/credit account-pair analysis
+
+    Builds the co-occurrence matrix of debit accounts against credit accounts
+    as a sparse matrix over factorized account codes and scores every
+    observed combination by its rarity. Only the top-K rarest cells are
+    handed to the reporter.
+
+    Attributes
+    ----------
+    reporter : Report
+        The reporter used to plot the heatmap
+    top_k : int
+        The number of rarest account pairs to keep
+    accounts : pd.Index
+        The account codes in factorized order
+    pairs : scipy.sparse.coo_matrix
+        The account x account matrix of document counts (debit rows, credit columns)
+    result : pd.DataFrame
+        The top-K rarest account pairs
+    """
+
+    # factorized codes, two incidence matrices and their product
+    memory_per_row = 160
+
+    def __init__(
+        self,
+        reporter: Report,
+        top_k: int = 50,
+        document_column: str = "document_number",
+        account_column: str = "account",
+        amount_column: str = "amount",
+    ):
+        self.reporter = reporter
+        self.top_k = top_k
+        self.document_column = document_column
+        self.account_column = account_column
+        self.amount_column = amount_column
+        self.accounts = None
+        self.pairs = None
+        self.result = None
+
+    def prepare_data(self, dataframe: pd.DataFrame):
+        """
+        Builds the sparse account-pair matrix
+
+        Each document counts once per debit/credit account combination,
+        regardless of how many lines it posts to either account.
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal with one row per line item; positive amounts are
+            debits, negative amounts are credits
+        """
+        account_codes, self.accounts = pd.factorize(dataframe[self.account_column])
+        document_codes, documents = pd.factorize(dataframe[self.document_column])
+        amounts = dataframe[self.amount_column].to_numpy()
+
+        valid = (account_codes >= 0) & (document_codes >= 0)
+        shape = (len(documents), len(self.accounts))
+
+        def incidence(mask):
+            matrix = sparse.csr_matrix(
+                (
+                    np.ones(np.count_nonzero(mask), dtype=np.int64),
+                    (document_codes[mask], account_codes[mask]),
+                ),
+                shape=shape,
+            )
+            # csr_matrix sums duplicate lines, binarize to count documents
+            matrix.data[:] = 1
+            return matrix
+
+        debits = incidence(valid & (amounts > 0))
+        credits = incidence(valid & (amounts < 0))
+
+        self.pairs = (debits.T @ credits).tocoo()
+
+    def run_test_scenario(self) -> pd.DataFrame:
+        """
+        Scores the account pairs and selects the top-K rarest ones
+
+        The rarity of a pair is its self-information, -log2 of the share of
+        all debit/credit co-occurrences that fall on the pair.
+
+        Returns
+        -------
+        pd.DataFrame
+            The rarest pairs with the columns debit_account, credit_account,
+            count and rarity, sorted by descending rarity
+        """
+        counts = self.pairs.data
+        rarity = -np.log2(counts / counts.sum()) if len(counts) else counts
+
+        k = min(self.top_k, len(counts))
+        if k < len(counts):
+            candidates = np.argpartition(counts, k - 1)[:k]
+        else:
+            candidates = np.arange(len(counts))
+        candidates = candidates[np.argsort(-rarity[candidates], kind="stable")]
+
+        self.result = pd.DataFrame(
+            {
+                "debit_account": self.accounts.take(self.pairs.row[candidates]),
+                "credit_account": self.accounts.take(self.pairs.col[candidates]),
+                "count": counts[candidates],
+                "rarity": rarity[candidates],
+            }
+        )
+        return self.result
+
+    def create_report(self):
+        """
+        Plots the rarity of the top-K account pairs as a heatmap
+
+        The heatmap only spans the accounts that appear in the top-K pairs.
+        """
+        heatmap = self.result.pivot(
+            index="debit_account", columns="credit_account", values="rarity"
+        )
+        context = ReportContext(
+            title="Rarest debit/credit account combinations",
+            color="rarity",
+            x=[str(account) for account in heatmap.columns],
+            y=[str(account) for account in heatmap.index],
+        )
+        self.reporter.plot_heatmap(heatmap.to_numpy(), context)
+
+    def export_data(self) -> pd.DataFrame:
+        return self.result
+
+
+class JBTiming(JournalEntryTests):
+    """
+    Calendar-aware timing analysis
+
+    Flags postings on weekends, on public holidays, outside business hours
+    and within the last days of a period. The dates are converted to integer
+    day numbers once and looked up in a precomputed calendar bitmap; period
+    boundaries are found with a binary search.
+
+    The following keys of config.json are used:
+
+    - holidays: list of ISO dates of the local public holidays
+    - business_hours: [start, end] hours of the business day, after-hours
+      postings are not flagged when missing or without a time column
+    - period_end_days: the number of days before a period end that are
+      flagged (default 3)
+    - period_ends: list of ISO dates of the period ends, defaults to the
+      month ends
+
+    Attributes
+    ----------
+    reporter : Report
+        The reporter used to plot the flag counts
+    config : dict
+        The configuration of the journal entry test
+    time_column : str
+        The column with the entry timestamps used for after-hours postings;
+        posting dates carry no time of day
+    result : pd.DataFrame
+        One boolean column per flag, aligned with the journal
+    """
+
+    # timestamps, entry times, day numbers, calendar lookup and four flag
+    # columns
+    memory_per_row = 56
+
+    WEEKEND = 1
+    HOLIDAY = 2
+
+    def __init__(
+        self,
+        reporter: Report,
+        config: dict = None,
+        date_column: str = "posting_date",
+        time_column: str = None,
+    ):
+        self.reporter = reporter
+        self.config = config or {}
+        self.date_column = date_column
+        self.time_column = time_column
+        self.index = None
+        self.timestamps = None
+        self.times = None
+        self.result = None
+
+    def prepare_data(self, dataframe: pd.DataFrame):
+        """
+        Converts the posting dates and the entry timestamps to int64
+        nanoseconds since the epoch
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal containing the date column and the time column, if any
+        """
+        self.index = dataframe.index
+        self.timestamps = (
+            pd.to_datetime(dataframe[self.date_column])
+            .to_numpy(dtype="datetime64[ns]")
+            .view(np.int64)
+        )
+        self.times = None
+        if self.time_column is not None and self.time_column in dataframe.columns:
+            self.times = (
+                pd.to_datetime(dataframe[self.time_column])
+                .to_numpy(dtype="datetime64[ns]")
+                .view(np.int64)
+            )
+
+    def _calendar(self, first_day: int, last_day: int) -> np.ndarray:
+        """
+        Builds the calendar bitmap covering the day numbers first_day to last_day
+        """
+        days = np.arange(first_day, last_day + 1, dtype=np.int64)
+        # 1970-01-01 was a Thursday, shift so that Monday is 0
+        calendar = np.where((days + 3) % 7 >= 5, self.WEEKEND, 0).astype(np.uint8)
+
+        holidays = _to_day_numbers(self.config.get("holidays", []))
+        holidays = holidays[(holidays >= first_day) & (holidays <= last_day)]
+        calendar[holidays - first_day] |= self.HOLIDAY
+
+        return calendar
+
+    def _period_ends(self, first_day: int, last_day: int) -> np.ndarray:
+        """
+        Returns the sorted day numbers of the period ends
+        """
+        if "period_ends" in self.config:
+            return np.sort(_to_day_numbers(self.config["period_ends"]))
+
+        months = np.arange(
+            np.datetime64(first_day, "D").astype("datetime64[M]"),
+            np.datetime64(last_day, "D").astype("datetime64[M]") + 1,
+        )
+        return (months + 1).astype("datetime64[D]").astype(np.int64) - 1
+
+    def run_test_scenario(self) -> pd.DataFrame:
+        """
+        Flags the postings
+
+        Returns
+        -------
+        pd.DataFrame
+            The boolean columns weekend, holiday, after_hours and period_end,
+            aligned with the journal. Missing dates are never flagged,
+            after_hours only with business hours and entry timestamps.
+        """
+        n = len(self.timestamps)
+        flags = {
+            name: np.zeros(n, dtype=bool)
+            for name in ("weekend", "holiday", "after_hours", "period_end")
+        }
+        missing = np.iinfo(np.int64).min
+
+        valid = self.timestamps != missing
+        if valid.any():
+            first_day = int(self.timestamps[valid].min() // _NANOSECONDS_PER_DAY)
+            last_day = int(self.timestamps[valid].max() // _NANOSECONDS_PER_DAY)
+            calendar = self._calendar(first_day, last_day)
+            period_ends = self._period_ends(first_day, last_day)
+        business_hours = self.config.get("business_hours")
+        if self.times is None:
+            business_hours = None
+
+        for rows in self._chunks(n, "timing"):
+            # slices are views, the flags are written in place
+            chunk = {name: flag[rows] for name, flag in flags.items()}
+
+            dated = valid[rows]
+            if dated.any():
+                days = self.timestamps[rows][dated] // _NANOSECONDS_PER_DAY
+                lookup = calendar[days - first_day]
+                chunk["weekend"][dated] = (lookup & self.WEEKEND) != 0
+                chunk["holiday"][dated] = (lookup & self.HOLIDAY) != 0
+
+                position = np.searchsorted(period_ends, days, side="left")
+                in_period = position < len(period_ends)
+                days_to_end = np.full(len(days), np.iinfo(np.int64).max)
+                days_to_end[in_period] = (
+                    period_ends[position[in_period]] - days[in_period]
+                )
+                chunk["period_end"][dated] = days_to_end < self.config.get(
+                    "period_end_days", 3
+                )
+
+            if business_hours:
+                start, end = business_hours
+                times = self.times[rows]
+                entered = times != missing
+                seconds = (times[entered] % _NANOSECONDS_PER_DAY) // 10**9
+                chunk["after_hours"][entered] = (seconds < start * 3600) | (
+                    seconds >= end * 3600
+                )
+
+        self.result = pd.DataFrame(flags, index=self.index)
+        return self.result
+
+    def create_report(self):
+        counts = self.result.sum().rename_axis("flag").reset_index(name="count")
+        context = ReportContext(
+            title="Postings by timing anomaly", color="flag", x="flag", y="count"
+        )
+        self.reporter.plot_bar(counts, context)
+
+    def export_data(self) -> pd.DataFrame:
+        return self.result
+
+
+class JBDocumentSequence(JournalEntryTests):
+    """
+    Document-number sequence analysis
+
+    Finds gaps, duplicates and out-of-order numbering of the document
+    numbers per group (company and document type by default). The
+    integer-coded documents are sorted once, all checks are done with
+    differences between neighbours in that order. Gaps are reported as
+    start/end ranges so that their cost does not depend on their size.
+
+    Attributes
+    ----------
+    reporter : Report
+        The reporter used to plot the gaps per group
+    result : dict[str, pd.DataFrame]
+        The gaps, duplicates and out_of_order findings
+    invalid : np.ndarray
+        The positions of the rows whose document number is not an integer
+    """
+
+    # group, number and date codes, the sort order and their sorted copies
+    memory_per_row = 96
+
+    def __init__(
+        self,
+        reporter: Report,
+        group_columns: tuple = ("company", "document_type"),
+        document_column: str = "document_number",
+        date_column: str = "posting_date",
+    ):
+        self.reporter = reporter
+        self.group_columns = list(group_columns)
+        self.document_column = document_column
+        self.date_column = date_column
+        self.group_uniques = None
+        self.group = None
+        self.numbers = None
+        self.days = None
+        self.invalid = None
+        self.result = None
+
+    def prepare_data(self, dataframe: pd.DataFrame):
+        """
+        Codes the groups, document numbers and dates as integers
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal with one row per line item
+        """
+        numbers = _to_integers(dataframe[self.document_column])
+        days = (
+            pd.to_datetime(dataframe[self.date_column])
+            .to_numpy(dtype="datetime64[D]")
+            .view(np.int64)
+        )
+        codes, self.group_uniques = [], []
+        for column in self.group_columns:
+            column_codes, uniques = pd.factorize(
+                dataframe[column], use_na_sentinel=False
+            )
+            codes.append(column_codes)
+            self.group_uniques.append(uniques)
+
+        valid = numbers.notna().to_numpy() & (days != np.iinfo(np.int64).min)
+        self.invalid = np.flatnonzero(~valid)
+
+        shape = tuple(len(uniques) for uniques in self.group_uniques)
+        group = (
+            np.ravel_multi_index([c[valid] for c in codes], shape)
+            if codes
+            else np.zeros(np.count_nonzero(valid), dtype=np.int64)
+        )
+        self.group = group.astype(np.int64)
+        self.numbers = numbers.to_numpy(dtype=np.int64, na_value=0)[valid]
+        self.days = days[valid]
+
+    def _group_frame(self, group: np.ndarray) -> pd.DataFrame:
+        """
+        Decodes the combined group codes into the original group columns
+        """
+        shape = tuple(len(uniques) for uniques in self.group_uniques)
+        codes = np.unravel_index(group, shape) if shape else []
+        return pd.DataFrame(
+            {
+                column: uniques.take(column_codes)
+                for column, uniques, column_codes in zip(
+                    self.group_columns, self.group_uniques, codes
+                )
+            }
+        )
+
+    def run_test_scenario(self) -> dict:
+        """
+        Finds the gaps, duplicates and out-of-order document numbers
+
+        A document number is a duplicate if it is posted on more than one
+        date within its group. A document is out of order if it is posted
+        before a document with a lower number of the same group.
+
+        Returns
+        -------
+        dict[str, pd.DataFrame]
+            gaps: the group columns, start, end and missing count of every gap
+            duplicates: the group columns, document_number and the number of
+            distinct posting dates
+            out_of_order: the group columns, document_number and posting_date
+        """
+        order = np.lexsort((self.days, self.numbers, self.group))
+        group, numbers, days = self.group[order], self.numbers[order], self.days[order]
+
+        # collapse the line items to one row per group, number and date
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (
+            (group[1:] != group[:-1])
+            | (numbers[1:] != numbers[:-1])
+            | (days[1:] != days[:-1])
+        )
+        group, numbers, days = group[first], numbers[first], days[first]
+
+        same_group = group[1:] == group[:-1]
+        step = np.diff(numbers)
+
+        repeated = same_group & (step == 0)
+        new_number = np.ones(len(numbers), dtype=bool)
+        new_number[1:] = ~repeated
+        occurrences = np.diff(np.append(np.flatnonzero(new_number), len(numbers)))
+        is_duplicate = occurrences > 1
+        duplicate_rows = np.flatnonzero(new_number)[is_duplicate]
+        duplicates = self._group_frame(group[duplicate_rows])
+        duplicates["document_number"] = numbers[duplicate_rows]
+        duplicates["occurrences"] = occurrences[is_duplicate]
+
+        gap = np.flatnonzero(same_group & (step > 1))
+        gaps = self._group_frame(group[gap])
+        gaps["start"] = numbers[gap] + 1
+        gaps["end"] = numbers[gap + 1] - 1
+        gaps["missing"] = gaps["end"] - gaps["start"] + 1
+
+        # running maximum of the dates within each group, offset by group so
+        # that a single accumulate does not leak across group boundaries
+        numbers, days, group = numbers[new_number], days[new_number], group[new_number]
+        if len(days):
+            span = int(days.max() - days.min()) + 1
+            keyed = group * span + (days - days.min())
+            running = np.maximum.accumulate(keyed)
+            late = np.flatnonzero(keyed[1:] < running[:-1]) + 1
+        else:
+            late = np.array([], dtype=np.int64)
+        out_of_order = self._group_frame(group[late])
+        out_of_order["document_number"] = numbers[late]
+        out_of_order["posting_date"] = days[late].astype("datetime64[D]")
+
+        self.result = {
+            "gaps": gaps,
+            "duplicates": duplicates,
+            "out_of_order": out_of_order,
+        }
+        return self.result
+
+    def create_report(self):
+        gaps = self.result["gaps"]
+        summary = (
+            gaps.groupby(self.group_columns, as_index=False)["missing"].sum()
+            if self.group_columns
+            else gaps[["missing"]].sum().to_frame().T
+        )
+        context = ReportContext(
+            title="Missing document numbers per group",
+            color=self.group_columns[-1] if self.group_columns else None,
+            x=self.group_columns[0] if self.group_columns else None,
+            y="missing",
+        )
+        self.reporter.plot_bar(summary, context)
+
+    def export_data(self) -> dict:
+        return self.result
+
+
+class JBKeywords(JournalEntryTests):
+    """
+    Keyword screening of the journal descriptions
+
+    Scans every distinct description once with a multi-pattern automaton
+    for the keywords configured in config.json ("keywords") and maps the
+    hits back to the line items.
+
+    Attributes
+    ----------
+    reporter : Report
+        The reporter used to plot the keyword counts
+    automaton : KeywordAutomaton
+        The automaton built from the keywords
+    result : pd.DataFrame
+        The keyword hit set and a flagged column per line item
+    """
+
+    # codes and the hit set references, plus the distinct descriptions
+    memory_per_row = 32
+    memory_fixed = 64 * 2**20
+
+    def __init__(
+        self,
+        reporter: Report,
+        config: dict = None,
+        description_column: str = "description",
+    ):
+        self.reporter = reporter
+        self.config = config or {}
+        self.description_column = description_column
+        self.automaton = KeywordAutomaton(self.config.get("keywords", []))
+        self.index = None
+        self.codes = None
+        self.descriptions = None
+        self.result = None
+
+    def prepare_data(self, dataframe: pd.DataFrame):
+        """
+        Deduplicates the descriptions
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal containing the description column
+        """
+        self.index = dataframe.index
+        self.codes, self.descriptions = pd.factorize(dataframe[self.description_column])
+
+    def run_test_scenario(self) -> pd.DataFrame:
+        """
+        Searches the keywords in the distinct descriptions
+
+        Returns
+        -------
+        pd.DataFrame
+            The columns keywords (frozenset of the keywords found) and
+            flagged, aligned with the journal
+        """
+        hits = np.empty(len(self.descriptions) + 1, dtype=object)
+        for texts in self._chunks(len(self.descriptions), "keywords", "descriptions"):
+            hits[texts] = [
+                self.automaton.search(str(text)) for text in self.descriptions[texts]
+            ]
+        # missing descriptions are coded -1 and pick up the empty set
+        hits[-1] = frozenset()
+
+        keywords = hits[self.codes]
+        self.result = pd.DataFrame(
+            {
+                "keywords": keywords,
+                "flagged": np.array([bool(hit) for hit in hits])[self.codes],
+            },
+            index=self.index,
+        )
+        return self.result
+
+    def create_report(self):
+        counts = (
+            self.result.loc[self.result["flagged"], "keywords"]
+            .explode()
+            .value_counts()
+            .rename_axis("keyword")
+            .reset_index(name="count")
+        )
+        context = ReportContext(
+            title="Line items per keyword", color="keyword", x="keyword", y="count"
+        )
+        self.reporter.plot_bar(counts, context)
+
+    def export_data(self) -> pd.DataFrame:
+        return self.result
+
+
+class JBRoundAmounts(JournalEntryTests):
+    """
+    Round-amount and repeating-amount analysis
+
+    The amounts are converted once to fixed-point integer cents, the rules
+    are integer modulo and range checks on them plus a frequency count of
+    the amounts per user and account via factorize and bincount.
+
+    The following keys of config.json are used:
+
+    - round_amounts: the multiples flagged as round (default [1000, 10000])
+    - approval_thresholds: the approval limits, amounts just below a limit
+      are flagged
+    - threshold_margin: the relative margin below a limit that is flagged
+      (default 0.05)
+    - repeat_min_count: the number of postings of the same amount by the
+      same user to the same account that is flagged (default 5)
+
+    Attributes
+    ----------
+    reporter : Report
+        The reporter used to plot the flag counts
+    config : dict
+        The configuration of the journal entry test
+    result : pd.DataFrame
+        One boolean column per rule, aligned with the journal
+    """
+
+    # cents, three key codes, the combined key and its counts
+    memory_per_row = 56
+
+    def __init__(
+        self,
+        reporter: Report,
+        config: dict = None,
+        amount_column: str = "amount",
+        user_column: str = "user",
+        account_column: str = "account",
+    ):
+        self.reporter = reporter
+        self.config = config or {}
+        self.amount_column = amount_column
+        self.user_column = user_column
+        self.account_column = account_column
+        self.index = None
+        self.cents = None
+        self.users = None
+        self.accounts = None
+        self.result = None
+
+    def prepare_data(self, dataframe: pd.DataFrame):
+        """
+        Converts the amounts to integer cents and codes the users and accounts
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal with the amount, user and account columns
+        """
+        self.index = dataframe.index
+        amounts = np.abs(dataframe[self.amount_column].to_numpy(dtype=np.float64))
+        # missing amounts become 0 cents, which no rule flags
+        self.cents = np.rint(np.nan_to_num(amounts) * 100).astype(np.int64)
+        self.users, _ = pd.factorize(dataframe[self.user_column], use_na_sentinel=False)
+        self.accounts, _ = pd.factorize(
+            dataframe[self.account_column], use_na_sentinel=False
+        )
+
+    def run_test_scenario(self) -> pd.DataFrame:
+        """
+        Flags the round, just-below-threshold and repeated amounts
+
+        Returns
+        -------
+        pd.DataFrame
+            A round_<multiple> column per configured multiple and the
+            below_threshold and repeated_amount columns, aligned with the
+            journal
+        """
+        posted = self.cents > 0
+        flags = {}
+
+        for multiple in self.config.get("round_amounts", [1000, 10000]):
+            flags[f"round_{multiple}"] = posted & (
+                self.cents % int(round(multiple * 100)) == 0
+            )
+
+        below = np.zeros(len(self.cents), dtype=bool)
+        margin = self.config.get("threshold_margin", 0.05)
+        for threshold in self.config.get("approval_thresholds", []):
+            limit = int(round(threshold * 100))
+            below |= (self.cents < limit) & (
+                self.cents >= int(round(threshold * (1 - margin) * 100))
+            )
+        flags["below_threshold"] = below
+
+        amount_codes, unique_amounts = pd.factorize(self.cents)
+        key = (
+            self.users.astype(np.int64) * (self.accounts.max(initial=0) + 1)
+            + self.accounts
+        ) * len(unique_amounts) + amount_codes
+        codes, _ = pd.factorize(key)
+        counts = np.bincount(codes)[codes]
+        flags["repeated_amount"] = posted & (
+            counts >= self.config.get("repeat_min_count", 5)
+        )
+
+        self.result = pd.DataFrame(flags, index=self.index)
+        return self.result
+
+    def create_report(self):
+        counts = self.result.sum().rename_axis("flag").reset_index(name="count")
+        context = ReportContext(
+            title="Postings by amount pattern", color="flag", x="flag", y="count"
+        )
+        self.reporter.plot_bar(counts, context)
+
+    def export_data(self) -> pd.DataFrame:
+        return self.result
+
+
+class JBUserActivity(JournalEntryTests):
+    """
+    User activity and segregation-of-duties analysis
+
+    Profiles the posting behaviour of every user from factorized user and
+    account codes: line and document counts, posted value, accounts
+    touched (from a sparse user x account crosstab), entries approved by
+    their own creator and rarely active users posting large amounts. The
+    result has one row per user and is small enough to plot directly.
+
+    The following keys of config.json are used:
+
+    - rare_user_max_lines: the maximum number of lines of a rarely active
+      user (default 10)
+    - large_amount: the absolute amount that counts as large, defaults to
+      the 99th percentile of the absolute amounts
+
+    Attributes
+    ----------
+    reporter : Report
+        The reporter used to plot the user profiles
+    config : dict
+        The configuration of the journal entry test
+    result : pd.DataFrame
+        The activity profile per user
+    line_flags : pd.DataFrame
+        The self_approved and rare_user_large flags per line item
+    """
+
+    # user, approver, account and document codes, amounts and the sort order
+    memory_per_row = 72
+    checkpointed = ("line_flags",)
+
+    def __init__(
+        self,
+        reporter: Report,
+        config: dict = None,
+        user_column: str = "user",
+        approver_column: str = "approver",
+        account_column: str = "account",
+        document_column: str = "document_number",
+        amount_column: str = "amount",
+    ):
+        self.reporter = reporter
+        self.config = config or {}
+        self.user_column = user_column
+        self.approver_column = approver_column
+        self.account_column = account_column
+        self.document_column = document_column
+        self.amount_column = amount_column
+        self.index = None
+        self.users = None
+        self.user_codes = None
+        self.approver_codes = None
+        self.account_codes = None
+        self.document_codes = None
+        self.amounts = None
+        self.result = None
+        self.line_flags = None
+
+    def prepare_data(self, dataframe: pd.DataFrame):
+        """
+        Codes the users and approvers in one shared dictionary, and the
+        accounts and documents
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The journal with the user, approver, account, document and
+            amount columns
+        """
+        self.index = dataframe.index
+        rows = len(dataframe)
+        codes, self.users = pd.factorize(
+            np.concatenate(
+                (
+                    dataframe[self.user_column].to_numpy(dtype=object),
+                    dataframe[self.approver_column].to_numpy(dtype=object),
+                )
+            )
+        )
+        self.user_codes, self.approver_codes = codes[:rows], codes[rows:]
+        self.account_codes, _ = pd.factorize(dataframe[self.account_column])
+        self.document_codes, _ = pd.factorize(dataframe[self.document_column])
+        self.amounts = np.nan_to_num(
+            np.abs(dataframe[self.amount_column].to_numpy(dtype=np.float64))
+        )
+
+    def _distinct_per_user(self, codes: np.ndarray, users: np.ndarray) -> np.ndarray:
+        """
+        Counts the distinct codes per user from a sparse crosstab
+        """
+        valid = codes >= 0
+        crosstab = sparse.csr_matrix(
+            (
+                np.ones(np.count_nonzero(valid), dtype=np.int8),
+                (users[valid], codes[valid]),
+            ),
+            shape=(len(self.users), codes.max(initial=-1) + 1),
+        )
+        crosstab.sum_duplicates()
+        return np.diff(crosstab.indptr)
+
+    def run_test_scenario(self) -> pd.DataFrame:
+        """
+        Profiles the users
+
+        Returns
+        -------
+        pd.DataFrame
+            The columns user, lines, documents, value, max_amount, accounts,
+            self_approved and rarely_active_large, one row per posting user
+        """
+        n = len(self.users)
+        posted = self.user_codes >= 0
+        users = self.user_codes[posted]
+        amounts = self.amounts[posted]
+
+        lines = np.bincount(users, minlength=n)
+        value = np.bincount(users, weights=amounts, minlength=n)
+
+        # maximum per user from a stable sort by user and a segmented reduce;
+        # numpy radix sorts codes of 16 bits, which covers most journals
+        keys = users.astype(np.uint16) if n < 2**16 else users
+        order = np.argsort(keys, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(lines)[:-1]))
+        max_amount = np.zeros(n)
+        active = lines > 0
+        if len(order):
+            max_amount[active] = np.maximum.reduceat(amounts[order], starts[active])
+
+        self_approved_lines = posted & (self.user_codes == self.approver_codes)
+        self_approved = np.bincount(self.user_codes[self_approved_lines], minlength=n)
+
+        large_amount = self.config.get("large_amount")
+        if large_amount is None:
+            large_amount = np.percentile(amounts, 99) if len(amounts) else 0.0
+        rarely_active_large = (
+            active
+            & (lines <= self.config.get("rare_user_max_lines", 10))
+            & (max_amount >= large_amount)
+        )
+
+        self.line_flags = pd.DataFrame(
+            {
+                "self_approved": self_approved_lines,
+                "rare_user_large": posted
+                & np.append(rarely_active_large, False)[self.user_codes]
+                & (self.amounts >= large_amount),
+            },
+            index=self.index,
+        )
+        self.result = pd.DataFrame(
+            {
+                "user": self.users,
+                "lines": lines,
+                "documents": self._distinct_per_user(
+                    self.document_codes[posted], users
+                ),
+                "value": value,
+                "max_amount": max_amount,
+                "accounts": self._distinct_per_user(self.account_codes[posted], users),
+                "self_approved": self_approved,
+                "rarely_active_large": rarely_active_large,
+            }
+        )[active].reset_index(drop=True)
+        return self.result
+
+    def flags(self) -> dict:
+        """
+        Returns the line item flags self_approved and rare_user_large as
+        flag sets
+
+        Raises
+        ------
+        RuntimeError
+            If the scenario was not run
+        """
+        if self.line_flags is None:
+            raise RuntimeError(
+                "JBUserActivity line flags not computed, run run_test_scenario"
+            )
+        return FlagSet.from_frame(self.line_flags)
+
+    def create_report(self):
+        self.reporter.plot_grouped_bar(
+            self.result,
+            ReportContext(
+                title="Lines and self-approved lines per user",
+                color=None,
+                x="user",
+                y=["lines", "self_approved"],
+                barmode="group",
+            ),
+        )
+        self.reporter.plot_box(
+            self.result,
+            ReportContext(title="Posted value per user", color=None, y="value"),
+        )
+
+    def export_data(self) -> pd.DataFrame:
+        return self.result
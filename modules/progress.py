@@ -0,0 +1,189 @@
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+
+class OperationCancelled(Exception):
+    """Raised at a chunk boundary after cancellation was requested"""
+
+
+class CancellationToken:
+    """
+    A flag to request the cooperative cancellation of a long operation
+
+    The operation checks the token at its chunk boundaries, where caches
+    and files are consistent, and raises OperationCancelled. The token can
+    be cancelled from another thread, a notebook callback or on Ctrl+C
+    within handle_interrupt.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def __repr__(self):
+        return f"CancellationToken(cancelled={self.cancelled})"
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def reset(self) -> None:
+        self._event.clear()
+
+    def check(self) -> None:
+        """
+        Raises
+        ------
+        OperationCancelled
+            If the cancellation was requested
+        """
+        if self.cancelled:
+            raise OperationCancelled("operation cancelled")
+
+    @contextmanager
+    def handle_interrupt(self):
+        """
+        Turns Ctrl+C (or a kernel interrupt) into a cancellation request
+        instead of a KeyboardInterrupt raised at an arbitrary point
+
+        Only effective in the main thread, elsewhere the handler is left as is.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield self
+            return
+
+        previous = signal.signal(signal.SIGINT, lambda *_: self.cancel())
+        try:
+            yield self
+        finally:
+            signal.signal(signal.SIGINT, previous)
+
+
+class Progress:
+    """
+    Progress of a long operation, reported through a callback
+
+    Operations call start once and advance at every chunk boundary; the
+    callback receives the Progress itself and is throttled to one call per
+    interval, plus one on start and finish. advance also checks the
+    cancellation token.
+
+    Attributes
+    ----------
+    task : str
+        The name of the running operation
+    total : int
+        The total number of units, None if unknown
+    done : int
+        The number of units processed
+    unit : str
+        The unit of total and done, e.g. rows
+    partitions : int
+        The number of partitions processed
+    """
+
+    def __init__(
+        self,
+        callback=None,
+        token: CancellationToken = None,
+        interval: float = 0.5,
+    ):
+        """
+        Parameters
+        ----------
+        callback : callable
+            Called with the Progress, e.g. print_progress or a notebook widget update
+        token : CancellationToken
+            The token checked at every chunk boundary
+        interval : float
+            The minimum number of seconds between two callbacks
+        """
+        self.callback = callback
+        self.token = token
+        self.interval = interval
+        self.task = None
+        self.total = None
+        self.done = 0
+        self.unit = "rows"
+        self.partitions = 0
+        self.started = None
+        self.finished = False
+        self._reported = 0.0
+
+    def __repr__(self):
+        return f"Progress(task={self.task}, done={self.done}, total={self.total})"
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started if self.started else 0.0
+
+    @property
+    def eta(self) -> float:
+        """
+        The estimated number of seconds left, None if unknown
+        """
+        if not self.total or not self.done:
+            return None
+        return self.elapsed / self.done * (self.total - self.done)
+
+    def _report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if self.callback and (force or now - self._reported >= self.interval):
+            self._reported = now
+            self.callback(self)
+
+    def start(self, task: str, total: int = None, unit: str = "rows") -> None:
+        """
+        Starts reporting a new operation
+
+        Raises
+        ------
+        OperationCancelled
+            If the cancellation was requested before the start
+        """
+        self.task, self.total, self.unit = task, total, unit
+        self.done, self.partitions, self.finished = 0, 0, False
+        self.started = time.monotonic()
+        self._report(force=True)
+        self.check()
+
+    def advance(self, units: int = 0, partitions: int = 1) -> None:
+        """
+        Records a completed chunk and checks for cancellation
+
+        Raises
+        ------
+        OperationCancelled
+            If the cancellation was requested
+        """
+        self.done += units
+        self.partitions += partitions
+        self._report()
+        self.check()
+
+    def finish(self) -> None:
+        self.finished = True
+        self._report(force=True)
+
+    def check(self) -> None:
+        if self.token is not None:
+            self.token.check()
+
+
+def print_progress(progress: Progress) -> None:
+    """
+    Prints the progress on a single, overwritten line of the console or notebook
+    """
+    total = f"/{progress.total:,}" if progress.total is not None else ""
+    eta = f", ETA {progress.eta:,.0f}s" if progress.eta is not None else ""
+    end = "\n" if progress.finished else ""
+    print(
+        f"\r{progress.task}: {progress.done:,}{total} {progress.unit}, "
+        f"{progress.partitions:,} partitions, {progress.elapsed:,.1f}s{eta}",
+        end=end,
+        flush=True,
+    )
@@ -0,0 +1,125 @@
+import numpy as np
+
+# the samplers work on positions so that the population is never copied,
+# rows are only materialized for the selected positions by the caller
+
+
+def random_sample(population_size: int, size: int, seed: int = None) -> np.ndarray:
+    """
+    Draws a simple random sample without replacement
+
+    Parameters
+    ----------
+    population_size : int
+        The number of items in the population
+    size : int
+        The number of items to draw, capped at the population size
+    seed : int
+        The seed of the random number generator
+
+    Returns
+    -------
+    np.ndarray
+        The sorted positions of the sampled items
+    """
+    rng = np.random.default_rng(seed)
+    size = min(size, population_size)
+    return np.sort(rng.choice(population_size, size=size, replace=False))
+
+
+def monetary_unit_sample(
+    amounts: np.ndarray, size: int, seed: int = None
+) -> np.ndarray:
+    """
+    Draws a monetary-unit sample with a random start
+
+    The absolute amounts are laid out on a cumulative monetary scale that is
+    cut into size equal intervals; the item holding the selected monetary
+    unit of every interval is sampled. Items larger than the interval can
+    hold several selections and are returned once.
+
+    Parameters
+    ----------
+    amounts : np.ndarray
+        The amounts of the population, missing amounts are never selected
+    size : int
+        The number of monetary units to select
+    seed : int
+        The seed of the random number generator
+
+    Returns
+    -------
+    np.ndarray
+        The sorted, unique positions of the sampled items
+    """
+    rng = np.random.default_rng(seed)
+    cumulative = np.cumsum(np.nan_to_num(np.abs(amounts), nan=0.0))
+    total = cumulative[-1] if len(cumulative) else 0.0
+    if size <= 0 or total <= 0:
+        return np.array([], dtype=np.int64)
+
+    interval = total / size
+    units = rng.uniform(0, interval) + interval * np.arange(size)
+    return np.unique(np.searchsorted(cumulative, units, side="right"))
+
+
+def stratified_sample(
+    amounts: np.ndarray,
+    bands: list,
+    sizes,
+    seed: int = None,
+) -> tuple:
+    """
+    Draws a random sample from every amount band
+
+    Parameters
+    ----------
+    amounts : np.ndarray
+        The amounts of the population, banded by their absolute value
+    bands : list
+        The ascending inner band limits, n limits define n + 1 strata; an
+        amount equal to a limit belongs to the upper stratum
+    sizes : int or list[int]
+        The number of items to draw per stratum, either the same for every
+        stratum or one per stratum
+    seed : int
+        The seed of the random number generator
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The sorted positions of the sampled items and their stratum numbers
+
+    Raises
+    ------
+    ValueError
+        If the number of sizes does not match the number of strata
+    """
+    rng = np.random.default_rng(seed)
+    n_strata = len(bands) + 1
+    sizes = np.asarray(sizes, dtype=np.int64)
+    if sizes.ndim == 0:
+        sizes = np.full(n_strata, sizes)
+    elif len(sizes) != n_strata:
+        raise ValueError(f"Expected {n_strata} sample sizes, got {len(sizes)}")
+
+    amounts = np.abs(np.asarray(amounts, dtype=np.float64))
+    strata = np.searchsorted(np.asarray(bands), amounts, side="right")
+    # missing amounts go to an extra stratum that is never sampled
+    strata[np.isnan(amounts)] = n_strata
+    # numpy sorts integers of 16 bits and less with a radix sort when the
+    # sort is stable, linear in the rows
+    keys = strata.astype(np.uint16) if n_strata < 2**16 else strata
+    order = np.argsort(keys, kind="stable")
+    offsets = np.concatenate(
+        ([0], np.cumsum(np.bincount(strata, minlength=n_strata + 1)))
+    )
+
+    positions = []
+    for stratum in range(n_strata):
+        members = order[offsets[stratum] : offsets[stratum + 1]]
+        size = min(sizes[stratum], len(members))
+        positions.append(members[rng.choice(len(members), size, replace=False)])
+
+    positions = np.sort(np.concatenate(positions))
+    return positions, strata[positions]
@@ -0,0 +1,114 @@
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from modules.progress import Progress
+
+_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def parse_size(size) -> int:
+    """
+    Converts a memory size such as 8589934592, "8G" or "512 MB" to bytes
+
+    Raises
+    ------
+    ValueError
+        If the size cannot be parsed
+    """
+    if isinstance(size, (int, float)):
+        return int(size)
+
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)(?:i?B)?\s*", str(size), re.I)
+    if not match:
+        raise ValueError(f"Invalid memory size: {size}")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+class ScenarioScheduler:
+    """
+    Runs scenarios in parallel within a memory budget
+
+    A scenario is admitted only while the sum of the peak memory estimates
+    of the running scenarios (JournalEntryTests.estimate_memory) stays
+    within the budget; the others wait in order until enough memory is
+    released. A scenario whose estimate alone exceeds the budget runs on
+    its own.
+
+    Attributes
+    ----------
+    memory_budget : int
+        The memory budget in bytes
+    max_workers : int
+        The maximum number of scenarios running at the same time
+    """
+
+    def __init__(self, memory_budget, max_workers: int = 4):
+        self.memory_budget = parse_size(memory_budget)
+        self.max_workers = max_workers
+
+    def __repr__(self):
+        return (
+            f"ScenarioScheduler(memory_budget={self.memory_budget}, "
+            f"max_workers={self.max_workers})"
+        )
+
+    def run(
+        self, scenarios: dict, function, rows: int, progress: Progress = None
+    ) -> dict:
+        """
+        Runs the scenarios
+
+        Parameters
+        ----------
+        scenarios : dict[str, JournalEntryTests]
+            The scenarios by name
+        function : callable
+            Called with the name and the scenario in a worker thread
+        rows : int
+            The number of rows of the journal, used for the estimates
+        progress : Progress
+            Advanced per completed scenario; on cancellation no further
+            scenario is admitted and the running ones are completed
+
+        Returns
+        -------
+        dict
+            The return values of function by scenario name, in the order of
+            the scenarios
+
+        Raises
+        ------
+        Exception
+            The first exception raised by a scenario, after the running
+            scenarios have completed
+        """
+        pending = [
+            (name, scenario, scenario.estimate_memory(rows))
+            for name, scenario in scenarios.items()
+        ]
+        running, results = {}, {}
+        used = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for item in list(pending):
+                    name, scenario, estimate = item
+                    if len(running) >= self.max_workers:
+                        break
+                    if used + estimate <= self.memory_budget or not running:
+                        future = executor.submit(function, name, scenario)
+                        running[future] = (name, estimate)
+                        used += estimate
+                        pending.remove(item)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                # an exception leaves the executor, which waits for the
+                # running scenarios without admitting the pending ones
+                for future in done:
+                    name, estimate = running.pop(future)
+                    used -= estimate
+                    results[name] = future.result()
+                    if progress is not None:
+                        progress.advance(1)
+
+        return {name: results[name] for name in scenarios if name in results}
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+# the schema in config.json maps the client column names to the canonical
+# fields and types, e.g.
+#
+# "schema": {
+#     "Belegnummer": {"field": "document_number", "type": "code"},
+#     "Buchungsdatum": {"field": "posting_date", "type": "date", "format": "%d.%m.%Y"},
+#     "Betrag": {"field": "amount", "type": "amount", "decimal": ",", "thousands": "."},
+#     "Manuell": {"field": "manual", "type": "boolean"}
+# }
+
+TRUE_VALUES = {"true", "t", "1", "1.0", "yes", "y", "x", "j", "ja"}
+FALSE_VALUES = {"false", "f", "0", "0.0", "no", "n", "nein", ""}
+
+
+def _on_uniques(series: pd.Series, convert) -> pd.Series:
+    """
+    Applies a vectorized conversion to the distinct values of a series only
+
+    Journals repeat the same dates, codes and flags millions of times, so the
+    values are factorized and only the uniques are converted.
+    """
+    codes, uniques = pd.factorize(series)
+    converted = convert(pd.Series(uniques))
+    values = pd.api.extensions.take(
+        converted.to_numpy(), codes, allow_fill=True, fill_value=None
+    )
+    return pd.Series(values, index=series.index, dtype=converted.dtype)
+
+
+def _to_date(series: pd.Series, spec: dict) -> pd.Series:
+    return _on_uniques(
+        series,
+        lambda values: pd.to_datetime(
+            values, format=spec.get("format"), errors="coerce"
+        ),
+    )
+
+
+def _to_amount(series: pd.Series, spec: dict) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+
+    def convert(values):
+        text = values.astype(str).str.strip()
+        if "thousands" in spec:
+            text = text.str.replace(spec["thousands"], "", regex=False)
+        if "decimal" in spec:
+            text = text.str.replace(spec["decimal"], ".", regex=False)
+        # trailing minus signs as exported by some ERP systems
+        trailing = text.str.endswith("-")
+        text = text.where(~trailing, "-" + text.str[:-1])
+        return pd.to_numeric(text, errors="coerce").astype("float64")
+
+    return _on_uniques(series, convert)
+
+
+def _to_code(series: pd.Series, spec: dict) -> pd.Series:
+    return _on_uniques(series, lambda values: values.astype(str).str.strip()).astype(
+        "category"
+    )
+
+
+def _to_boolean(series: pd.Series, spec: dict) -> pd.Series:
+    def convert(values):
+        text = values.astype(str).str.strip().str.lower()
+        return pd.Series(
+            np.where(
+                text.isin(TRUE_VALUES),
+                True,
+                np.where(text.isin(FALSE_VALUES), False, None),
+            ),
+            dtype="boolean",
+        )
+
+    return _on_uniques(series, convert)
+
+
+COERCIONS = {
+    "date": _to_date,
+    "amount": _to_amount,
+    "code": _to_code,
+    "boolean": _to_boolean,
+}
+
+
+def coerce(dataframe: pd.DataFrame, schema: dict) -> tuple:
+    """
+    Renames and converts the client columns to the canonical fields
+
+    Every column is converted in one vectorized pass. Values that are
+    present but cannot be converted become missing and their row positions
+    are collected per field.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The journal as delivered by the client
+    schema : dict
+        The column schema, mapping client column names to a dict with the
+        canonical field name ("field") and its type ("type", one of date,
+        amount, code or boolean) plus type specific options
+
+    Returns
+    -------
+    tuple[pd.DataFrame, dict[str, np.ndarray]]
+        The journal with the canonical columns only, and the positions of the
+        rows that failed coercion per field
+
+    Raises
+    ------
+    KeyError
+        If a column of the schema is not in the dataframe
+    ValueError
+        If a column has an unknown type
+    """
+    columns, failures = {}, {}
+    for column, spec in schema.items():
+        if column not in dataframe.columns:
+            raise KeyError(f"Column {column} of the schema not found in the data")
+        if spec["type"] not in COERCIONS:
+            raise ValueError(f"type of {column} must be one of {', '.join(COERCIONS)}")
+
+        original = dataframe[column]
+        converted = COERCIONS[spec["type"]](original, spec)
+        failed = converted.isna().to_numpy() & original.notna().to_numpy()
+        if spec["type"] == "code":
+            failed[:] = False
+
+        columns[spec["field"]] = converted
+        failures[spec["field"]] = np.flatnonzero(failed)
+
+    return pd.DataFrame(columns, index=dataframe.index), failures
+
+
+def memory_report(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reports the dtype and the memory usage of every column
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The dataframe to report on
+
+    Returns
+    -------
+    pd.DataFrame
+        The columns column, dtype and bytes, with the index included as a row
+    """
+    usage = dataframe.memory_usage(deep=True)
+    return pd.DataFrame(
+        {
+            "column": usage.index,
+            "dtype": [
+                str(dataframe[column].dtype) if column != "Index" else "index"
+                for column in usage.index
+            ],
+            "bytes": usage.to_numpy(),
+        }
+    )
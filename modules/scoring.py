@@ -0,0 +1,133 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from modules.bitsets import FlagSet
+from modules.progress import Progress
+
+
+class RiskScorer:
+    """
+    Composite risk score of the journal entries across scenarios
+
+    The score of a row is the weighted sum of its scenario flags, where a
+    flag is either a boolean (weight applies once) or a per-row severity
+    (weight applies proportionally). Scores are computed partition by
+    partition and only the running top-N candidates are kept, so the whole
+    score vector never has to be held in memory.
+
+    Attributes
+    ----------
+    weights : dict[str, float]
+        The weight per flag, flags without a weight are ignored
+    """
+
+    def __init__(self, weights: dict):
+        self.weights = weights
+
+    def __repr__(self):
+        return f"RiskScorer(weights={self.weights})"
+
+    def score(self, flags: dict) -> np.ndarray:
+        """
+        Scores the rows of one partition
+
+        Parameters
+        ----------
+        flags : dict[str, np.ndarray]
+            The boolean masks or numeric severities of the partition by flag
+
+        Returns
+        -------
+        np.ndarray
+            The float64 score per row
+
+        Raises
+        ------
+        ValueError
+            If the flags cover a different number of rows
+        """
+        scores = None
+        for name, weight in self.weights.items():
+            if name not in flags:
+                continue
+            values = np.asarray(flags[name], dtype=np.float64)
+            if scores is None:
+                scores = np.zeros(len(values))
+            elif len(values) != len(scores):
+                raise ValueError(f"flag {name} covers a different number of rows")
+            scores += weight * values
+        return scores if scores is not None else np.zeros(0)
+
+    def top_n(
+        self, partitions: Iterable, n: int, progress: Progress = None
+    ) -> pd.DataFrame:
+        """
+        Selects the n highest scoring rows over all partitions
+
+        Parameters
+        ----------
+        partitions : Iterable[tuple[int, dict]]
+            The row offset and the flags of every partition
+        n : int
+            The number of rows to select
+        progress : Progress
+            Advanced by the rows of every partition, may cancel between
+            partitions
+
+        Returns
+        -------
+        pd.DataFrame
+            The columns position and risk_score, sorted by descending score.
+            Rows with a score of zero are never selected.
+        """
+        positions = np.zeros(0, dtype=np.int64)
+        scores = np.zeros(0)
+        if n <= 0:
+            return pd.DataFrame({"position": positions, "risk_score": scores})
+
+        for offset, flags in partitions:
+            partition_scores = self.score(flags)
+            candidates = np.flatnonzero(partition_scores > 0)
+            positions = np.concatenate((positions, candidates + offset))
+            scores = np.concatenate((scores, partition_scores[candidates]))
+            if len(scores) > n:
+                # linear selection, the candidates are never fully sorted
+                keep = np.argpartition(-scores, n - 1)[:n]
+                positions, scores = positions[keep], scores[keep]
+            if progress is not None:
+                progress.advance(len(partition_scores))
+
+        order = np.lexsort((positions, -scores))
+        return pd.DataFrame({"position": positions[order], "risk_score": scores[order]})
+
+
+def partition_flags(flags: dict, partition_size: int = 1_000_000):
+    """
+    Yields the flags in partitions of rows
+
+    Parameters
+    ----------
+    flags : dict[str, FlagSet | np.ndarray]
+        The flags of the whole journal by name
+    partition_size : int
+        The number of rows per partition, rounded up to a multiple of 8
+
+    Yields
+    ------
+    tuple[int, dict[str, np.ndarray]]
+        The row offset and the flags of the partition
+    """
+    partition_size = -(-partition_size // 8) * 8
+    size = max((len(values) for values in flags.values()), default=0)
+    for start in range(0, size, partition_size):
+        stop = min(start + partition_size, size)
+        yield start, {
+            name: (
+                values.slice(start, stop)
+                if isinstance(values, FlagSet)
+                else values[start:stop]
+            )
+            for name, values in flags.items()
+        }
@@ -0,0 +1,306 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, quote, urlencode, urlparse
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from modules.JET import JETester
+from modules.jet_tetsts import (
+    JBAccountPairs,
+    JBDocumentSequence,
+    JBKeywords,
+    JBRoundAmounts,
+    JBTiming,
+    JBUserActivity,
+)
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def default_scenarios(jet: JETester) -> dict:
+    """
+    Returns the factories of the scenarios served for a journal entry test
+    """
+    return {
+        "account_pairs": lambda: JBAccountPairs(jet.reporter),
+        "timing": lambda: JBTiming(jet.reporter, jet.config),
+        "document_sequence": lambda: JBDocumentSequence(jet.reporter),
+        "keywords": lambda: JBKeywords(jet.reporter, jet.config),
+        "round_amounts": lambda: JBRoundAmounts(jet.reporter, jet.config),
+        "user_activity": lambda: JBUserActivity(jet.reporter, jet.config),
+    }
+
+
+def to_arrow(dataframe: pd.DataFrame) -> bytes:
+    """
+    Serializes a dataframe, including its index, as an Arrow IPC stream
+    """
+    dataframe = dataframe.copy(deep=False)
+    for column in dataframe.columns[dataframe.dtypes == object]:
+        # keyword hit sets have no Arrow type, send them as sorted lists
+        if dataframe[column].map(lambda value: isinstance(value, frozenset)).any():
+            dataframe[column] = dataframe[column].map(sorted)
+
+    table = pa.Table.from_pandas(dataframe, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_arrow(payload: bytes) -> pd.DataFrame:
+    """
+    Deserializes an Arrow IPC stream written by to_arrow
+    """
+    return pa.ipc.open_stream(payload).read_pandas()
+
+
+class JournalServer:
+    """
+    A local server keeping a journal entry test warm for its clients
+
+    The journal, its secondary indexes and the scenario checkpoints are
+    loaded once and shared by all notebook and CLI clients, which query
+    rows and run scenarios over HTTP. Tables are returned as Arrow IPC
+    streams, errors as JSON.
+
+    Routes
+    ------
+    GET /health
+        The number of rows and the indexed columns
+    GET /query?column=value&column=value
+        The rows matching all criteria, see JETester.query
+    POST /scenarios/<name>[?part=<key>]
+        The result of a scenario; part selects the table of scenarios
+        returning several tables
+
+    Attributes
+    ----------
+    jet : JETester
+        The served journal entry test
+    scenarios : dict[str, callable]
+        The factories of the served scenarios by name
+    address : tuple[str, int]
+        The host and port the server listens on
+    """
+
+    def __init__(
+        self,
+        jet: JETester,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        scenarios: dict = None,
+    ):
+        """
+        Raises
+        ------
+        ImportError
+            If pyarrow is not installed
+        """
+        if pa is None:
+            raise ImportError("Dependency pyarrow not installed")
+
+        self.jet = jet
+        self.scenarios = scenarios if scenarios is not None else default_scenarios(jet)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    def __repr__(self):
+        return f"JournalServer(jet={self.jet}, address={self.address})"
+
+    @property
+    def address(self) -> tuple:
+        return self._httpd.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    def warm_up(self) -> None:
+        """
+        Loads the journal, builds its secondary indexes and hashes it for
+        the checkpoints of the scenarios
+        """
+        self.jet.build_indexes()
+        self.jet.digest()
+
+    def serve_forever(self) -> None:
+        self.warm_up()
+        self._httpd.serve_forever()
+
+    def start(self) -> None:
+        """
+        Serves in a background thread, e.g. from a notebook
+        """
+        self.warm_up()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def query(self, params: dict) -> pd.DataFrame:
+        """
+        Queries the journal with criteria received as strings, converted to
+        the dtype of numeric columns
+        """
+        criteria = {}
+        for column, value in params.items():
+            if column in self.jet.df.columns and pd.api.types.is_numeric_dtype(
+                self.jet.df[column]
+            ):
+                value = pd.to_numeric(pd.Series(value)).tolist()
+            criteria[column] = value
+        return self.jet.query(**criteria)
+
+    def run_scenario(self, name: str, part: str = None) -> pd.DataFrame:
+        """
+        Runs a served scenario, reusing its checkpoint if still valid
+
+        Raises
+        ------
+        KeyError
+            If the scenario or the part is unknown
+        """
+        scenario = self.scenarios[name]()
+        result = self.jet.run_scenarios(
+            {name: scenario}, report=False, digest=self.jet.digest()
+        )[name]
+        if isinstance(result, dict):
+            if part is None:
+                raise KeyError(f"part required, one of {', '.join(result)}")
+            return result[part]
+        return result
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, status: int, payload: dict):
+                self._send(status, json.dumps(payload).encode(), "application/json")
+
+            def _send_table(self, dataframe: pd.DataFrame):
+                self._send(200, to_arrow(dataframe), ARROW_STREAM)
+
+            def _dispatch(self, method: str):
+                url = urlparse(self.path)
+                params = {
+                    key: values if len(values) > 1 else values[0]
+                    for key, values in parse_qs(url.query).items()
+                }
+                route = url.path.strip("/").split("/")
+                try:
+                    if method == "GET" and route == ["health"]:
+                        self._send_json(
+                            200,
+                            {
+                                "rows": len(server.jet.df),
+                                "indexes": list(server.jet.indexes),
+                            },
+                        )
+                    elif method == "GET" and route == ["query"]:
+                        self._send_table(server.query(params))
+                    elif (
+                        method == "POST" and route[0] == "scenarios" and len(route) == 2
+                    ):
+                        if route[1] not in server.scenarios:
+                            self._send_json(
+                                404, {"error": f"unknown scenario {route[1]}"}
+                            )
+                        else:
+                            self._send_table(
+                                server.run_scenario(route[1], params.get("part"))
+                            )
+                    else:
+                        self._send_json(404, {"error": f"unknown route {url.path}"})
+                except (KeyError, ValueError, TypeError) as error:
+                    self._send_json(400, {"error": str(error)})
+                except Exception as error:
+                    self._send_json(500, {"error": f"{type(error).__name__}: {error}"})
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class JournalClient:
+    """
+    A client of a JournalServer
+
+    Attributes
+    ----------
+    url : str
+        The base URL of the server, e.g. http://127.0.0.1:8765
+    """
+
+    def __init__(self, url: str = "http://127.0.0.1:8765"):
+        if pa is None:
+            raise ImportError("Dependency pyarrow not installed")
+        self.url = url.rstrip("/")
+
+    def __repr__(self):
+        return f"JournalClient(url={self.url})"
+
+    def _request(self, path: str, method: str = "GET"):
+        """
+        Raises
+        ------
+        RuntimeError
+            With the error message of the server if the request failed
+        """
+        request = Request(self.url + path, method=method)
+        try:
+            response = urlopen(request)
+        except HTTPError as error:
+            message = json.loads(error.read()).get("error", error.reason)
+            raise RuntimeError(f"{error.code}: {message}") from error
+
+        with response:
+            payload = response.read()
+            if response.headers.get_content_type() == ARROW_STREAM:
+                return from_arrow(payload)
+            return json.loads(payload)
+
+    def health(self) -> dict:
+        return self._request("/health")
+
+    def query(self, **criteria) -> pd.DataFrame:
+        """
+        Returns the rows matching all criteria, see JETester.query
+        """
+        return self._request("/query?" + urlencode(criteria, doseq=True))
+
+    def run_scenario(self, name: str, part: str = None) -> pd.DataFrame:
+        """
+        Returns the result of a scenario run on the server
+        """
+        path = f"/scenarios/{quote(name)}"
+        if part is not None:
+            path += "?" + urlencode({"part": part})
+        return self._request(path, method="POST")
@@ -0,0 +1,262 @@
+import contextlib
+import math
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from modules.progress import Progress
+
+# the rows of an Excel worksheet, including the header
+EXCEL_MAX_ROWS = 1_048_576
+SHEET_NAME_LENGTH = 31
+
+
+def sheet_name(name: str, number: int = 1) -> str:
+    """
+    Returns a valid worksheet name, numbered from the second overflow sheet
+    on, e.g. 'JB1', 'JB1 (2)'
+    """
+    name = re.sub(r"[\[\]:*?/\\]", "_", str(name)).strip("'") or "Sheet"
+    suffix = f" ({number})" if number > 1 else ""
+    return name[: SHEET_NAME_LENGTH - len(suffix)] + suffix
+
+
+def sheets(results: dict) -> dict:
+    """
+    Flattens scenario results to one table per sheet
+
+    Scenarios returning several tables, e.g. JBDocumentSequence, get a sheet
+    per table named after the scenario and the table; results that are no
+    tables are skipped.
+
+    Returns
+    -------
+    dict[str, pd.DataFrame]
+        The tables by sheet name
+    """
+    tables = {}
+    for name, result in results.items():
+        if isinstance(result, dict):
+            for part, table in sheets(result).items():
+                tables[f"{name} {part}"] = table
+        elif isinstance(result, pd.Series):
+            tables[name] = result.to_frame()
+        elif isinstance(result, pd.DataFrame):
+            tables[name] = result
+    return tables
+
+
+def _is_default_index(index: pd.Index) -> bool:
+    return isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+
+
+def prepare_sheet(dataframe: pd.DataFrame) -> tuple:
+    """
+    Converts a table to rows of values xlsxwriter writes as they are
+
+    Runs in a worker process, once per sheet of a table. Non-default
+    indexes, such as the row positions of flagged journal lines, become the
+    first columns; missing and infinite values become empty cells,
+    timezones are dropped and sets, lists and other objects are written as
+    text.
+
+    Returns
+    -------
+    tuple[list[str], list[bool], list[tuple]]
+        The header, whether a column holds dates and the rows
+    """
+    if not _is_default_index(dataframe.index):
+        dataframe = dataframe.reset_index()
+
+    columns, dates = [], []
+    for _, column in dataframe.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype(column.cat.categories.dtype)
+
+        if pd.api.types.is_datetime64_any_dtype(column):
+            if column.dt.tz is not None:
+                column = column.dt.tz_localize(None)
+            values = column.astype(object).where(column.notna(), None)
+            dates.append(True)
+        elif pd.api.types.is_bool_dtype(column) or pd.api.types.is_numeric_dtype(
+            column
+        ):
+            values = column.astype(object)
+            numbers = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values.where(np.isfinite(numbers), None)
+            dates.append(False)
+        else:
+            values = column.map(_text, na_action="ignore").astype(object)
+            values = values.where(column.notna(), None)
+            dates.append(False)
+        columns.append(values.tolist())
+
+    header = [str(column) for column in dataframe.columns]
+    return header, dates, list(zip(*columns))
+
+
+def _text(value):
+    if isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (set, frozenset)):
+        return ", ".join(sorted(map(str, value)))
+    if isinstance(value, (list, tuple)):
+        return ", ".join(map(str, value))
+    return str(value)
+
+
+class WorkbookExporter:
+    """
+    Exports tables to a single workbook with a sheet per table
+
+    The tables are converted in parallel worker processes, a sheet at a
+    time, and streamed into an xlsxwriter workbook in constant memory mode,
+    where every row is flushed to disk once written. Tables with more rows
+    than fit on a sheet continue on overflow sheets.
+
+    Attributes
+    ----------
+    max_rows : int
+        The maximum number of rows per sheet, without the header
+    date_format : str
+        The Excel number format of date columns
+    """
+
+    def __init__(
+        self, max_rows: int = EXCEL_MAX_ROWS - 1, date_format: str = "yyyy-mm-dd"
+    ):
+        if not 0 < max_rows < EXCEL_MAX_ROWS:
+            raise ValueError(f"max_rows must be between 1 and {EXCEL_MAX_ROWS - 1}")
+        self.max_rows = max_rows
+        self.date_format = date_format
+
+    def __repr__(self):
+        return f"WorkbookExporter(max_rows={self.max_rows})"
+
+    def layout(self, tables: dict) -> dict:
+        """
+        Returns the names of the sheets of every table, including overflow
+        sheets
+
+        Raises
+        ------
+        ValueError
+            If two sheets have the same name
+        """
+        layout, used = {}, set()
+        for name, table in tables.items():
+            count = max(math.ceil(len(table) / self.max_rows), 1)
+            layout[name] = [sheet_name(name, number) for number in range(1, count + 1)]
+            for sheet in layout[name]:
+                if sheet.lower() in used:
+                    raise ValueError(f"Duplicate sheet name {sheet}")
+                used.add(sheet.lower())
+        return layout
+
+    def export(
+        self,
+        tables: dict,
+        path: str,
+        max_workers: int = 4,
+        progress: Progress = None,
+    ) -> str:
+        """
+        Writes the tables to a workbook
+
+        Parameters
+        ----------
+        tables : dict[str, pd.DataFrame]
+            The tables by sheet name, in the order of the sheets, see sheets
+        path : str
+            The path of the workbook
+        max_workers : int
+            The maximum number of sheets converted or waiting to be written
+            at the same time, 1 converts them in the calling process
+        progress : Progress
+            Advanced per written sheet with its number of rows
+
+        Returns
+        -------
+        str
+            The path of the workbook
+        """
+        layout = self.layout(tables)
+        temporary = path + ".tmp"
+        workbook = xlsxwriter.Workbook(
+            temporary,
+            {
+                "constant_memory": True,
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+            },
+        )
+        header_format = workbook.add_format({"bold": True})
+        date_format = workbook.add_format({"num_format": self.date_format})
+
+        # the sheets are added in order upfront, each sheet is written as
+        # soon as its slice of the table is converted
+        worksheets = {
+            name: [workbook.add_worksheet(sheet) for sheet in names]
+            for name, names in layout.items()
+        }
+
+        if progress is not None:
+            progress.start("export_workbook", sum(map(len, tables.values())))
+
+        def slices():
+            for name, table in tables.items():
+                # the index is decided for the whole table, a slice of a
+                # default index is no default index
+                if not _is_default_index(table.index):
+                    table = table.reset_index()
+                for number in range(len(worksheets[name])):
+                    start = number * self.max_rows
+                    rows = table.iloc[start : start + self.max_rows]
+                    yield worksheets[name][number], rows.reset_index(drop=True)
+
+        def write(worksheet, prepared):
+            header, dates, rows = prepared
+            for column, is_date in enumerate(dates):
+                if is_date:
+                    worksheet.set_column(column, column, 12, date_format)
+            worksheet.write_row(0, 0, header, header_format)
+            for row, values in enumerate(rows, 1):
+                worksheet.write_row(row, 0, values)
+            if progress is not None:
+                progress.advance(len(rows))
+
+        try:
+            if max_workers == 1:
+                for worksheet, rows in slices():
+                    write(worksheet, prepare_sheet(rows))
+            else:
+                # at most max_workers slices are converted or waiting to be
+                # written, the next one is submitted once a sheet is written
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {}
+                    for worksheet, rows in slices():
+                        if len(futures) == max_workers:
+                            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                write(futures.pop(future), future.result())
+                        futures[executor.submit(prepare_sheet, rows)] = worksheet
+                    while futures:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            write(futures.pop(future), future.result())
+            workbook.close()
+        except BaseException:
+            with contextlib.suppress(Exception):
+                workbook.close()
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        os.replace(temporary, path)
+        if progress is not None:
+            progress.finish()
+        return path
@@ -1,4 +1,9 @@
+import functools
+import hashlib
+import json
+import os
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Union, Optional
 
 import pandas as pd
@@ -6,6 +11,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import plotly.subplots as sp
 
 
@@ -35,6 +41,145 @@ class ReportContext:
         self.y = y
 
 
+# plots drawn from every column of the dataframe, whatever the context names
+WHOLE_FRAME_KINDS = frozenset({"heatmap", "missing_values"})
+
+
+class FigureCache:
+    """
+    Cache of computed figures, in memory and optionally on disk
+
+    Figures are keyed by the kind of plot, a fingerprint of the data it
+    is drawn from and the attributes of the ReportContext, so a repeated
+    render of unchanged data returns the stored figure instead of
+    aggregating the dataframe again.
+
+    Attributes
+    ----------
+    path : str
+        The directory the figure specifications are stored in as JSON,
+        None to keep them in memory only
+    max_entries : int
+        The number of figures kept in memory, least recently used first out
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 32) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+
+    def __repr__(self):
+        return f"FigureCache(path={self.path}, figures={len(self._figures)})"
+
+    @staticmethod
+    def key(
+        kind: str,
+        data: Union[pd.DataFrame, np.ndarray],
+        options: Optional[ReportContext] = None,
+    ) -> str:
+        """
+        Fingerprints the data and the context of a figure
+
+        Only the columns referenced by the context are hashed, all of them
+        if the context references none or the kind of plot draws the whole
+        dataframe, see WHOLE_FRAME_KINDS.
+        """
+        digest = hashlib.blake2b(kind.encode(), digest_size=16)
+        context = vars(options) if options is not None else {}
+
+        if isinstance(data, pd.DataFrame) and kind in WHOLE_FRAME_KINDS:
+            digest.update(repr(list(data.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(data).to_numpy().tobytes())
+        elif isinstance(data, pd.DataFrame):
+            referenced = set()
+            for value in context.values():
+                values = value if isinstance(value, list) else [value]
+                referenced.update(
+                    v for v in values if isinstance(v, str) and v in data.columns
+                )
+            columns = [column for column in data.columns if column in referenced]
+            selected = data[columns] if columns else data
+            digest.update(repr(list(selected.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(selected).to_numpy().tobytes())
+        else:
+            data = np.asarray(data)
+            digest.update(f"{data.dtype}{data.shape}".encode())
+            digest.update(np.ascontiguousarray(data).tobytes())
+
+        digest.update(
+            json.dumps(
+                context,
+                sort_keys=True,
+                default=lambda value: (
+                    value.tolist() if isinstance(value, np.ndarray) else str(value)
+                ),
+            ).encode()
+        )
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[go.Figure]:
+        """
+        Returns the cached figure, None if it is not cached
+        """
+        if key in self._figures:
+            self._figures.move_to_end(key)
+            return self._figures[key]
+
+        if self.path is not None:
+            try:
+                with open(os.path.join(self.path, f"{key}.json")) as f:
+                    figure = pio.from_json(f.read())
+            except FileNotFoundError:
+                return None
+            self._remember(key, figure)
+            return figure
+
+        return None
+
+    def put(self, key: str, figure: go.Figure) -> None:
+        """
+        Caches a figure in memory and, with a path, on disk
+        """
+        self._remember(key, figure)
+
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            file = os.path.join(self.path, f"{key}.json")
+            with open(file + ".tmp", "w") as f:
+                f.write(figure.to_json())
+            os.replace(file + ".tmp", file)
+
+    def _remember(self, key: str, figure: go.Figure) -> None:
+        self._figures[key] = figure
+        self._figures.move_to_end(key)
+        while len(self._figures) > self.max_entries:
+            self._figures.popitem(last=False)
+
+
+def cached_figure(kind: str):
+    """
+    Decorates a method building a figure so that the figure is looked up in
+    and stored to the cache of the reporter before it is shown
+    """
+
+    def decorator(build):
+        @functools.wraps(build)
+        def plot(self, dataframe, options=None):
+            if self.cache is None:
+                figure = build(self, dataframe, options)
+            else:
+                key = self.cache.key(kind, dataframe, options)
+                figure = self.cache.get(key)
+                if figure is None:
+                    figure = build(self, dataframe, options)
+                    self.cache.put(key, figure)
+            figure.show()
+
+        return plot
+
+    return decorator
+
+
 class Report(ABC):
     """Report class interface"""
 
@@ -84,12 +229,21 @@ class ReporterPlotly(Report):
     """
     reporter class using plotly
 
+    Parameters
+    ----------
+    cache : FigureCache
+        the cache of the computed figures, None to always rebuild them
+
     Returns
     -------
     None
     """
 
-    def plot_missing_values(self, dataframe) -> None:
+    def __init__(self, cache: Optional[FigureCache] = None) -> None:
+        self.cache = cache
+
+    @cached_figure("missing_values")
+    def plot_missing_values(self, dataframe, options=None) -> go.Figure:
         """plot missing values
 
         Args:
@@ -219,8 +373,9 @@ class ReporterPlotly(Report):
 
         fig.update_layout(annotations=annotations)
 
-        fig.show()
+        return fig
 
+    @cached_figure("bar")
     def plot_bar(self, dataframe, options):
         fig = px.bar(
             dataframe,
@@ -230,8 +385,9 @@ class ReporterPlotly(Report):
             barmode=options.barmode if options.barmode else "group",
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("line")
     def plot_line(self, dataframe, options):
         fig = px.line(
             dataframe,
@@ -240,8 +396,9 @@ class ReporterPlotly(Report):
             color=options.color,
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("scatter")
     def plot_scatter(self, dataframe, options):
         fig = px.scatter(
             dataframe,
@@ -250,8 +407,9 @@ class ReporterPlotly(Report):
             color=options.color,
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("histogram")
     def plot_histogram(self, dataframe, options):
         fig = px.histogram(
             dataframe,
@@ -260,8 +418,9 @@ class ReporterPlotly(Report):
             color=options.color,
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("pie")
     def plot_pie(self, dataframe, options):
         fig = px.pie(
             dataframe,
@@ -270,8 +429,9 @@ class ReporterPlotly(Report):
             color=options.color,
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("box")
     def plot_box(self, dataframe, options):
         fig = px.box(
             dataframe,
@@ -280,8 +440,9 @@ class ReporterPlotly(Report):
             color=options.color,
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("heatmap")
     def plot_heatmap(self, dataframe, options):
         fig = px.imshow(
             dataframe,
@@ -290,8 +451,9 @@ class ReporterPlotly(Report):
             color_continuous_scale=options.color_discrete_map,
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("3d")
     def plot_3d(self, dataframe, options):
         fig = px.scatter_3d(
             dataframe,
@@ -300,8 +462,9 @@ class ReporterPlotly(Report):
             color=options.color,
             title=options.title,
         )
-        fig.show()
+        return fig
 
+    @cached_figure("grouped_bar")
     def plot_grouped_bar(self, dataframe, options):
         fig = px.bar(
             dataframe,
@@ -311,7 +474,7 @@ class ReporterPlotly(Report):
             barmode=options.barmode if options.barmode else "group",
             title=options.title,
         )
-        fig.show()
+        return fig
 
 
 class ReporterMatplotlib(Report):
@@ -402,8 +565,8 @@ class ReporterMatplotlib(Report):
         fig.show()
 
     def plot_3d(self, dataframe, options):
-        fig, ax = plt.subplots()
-        ax.scatter3d(dataframe[options.x], dataframe[options.y])
+        fig, ax = plt.subplots(subplot_kw={"projection": "3d"})
+        ax.scatter(dataframe[options.x], dataframe[options.y])
         ax.set_title(options.title)
         fig.show()
 
@@ -429,10 +592,10 @@ class ReporterFactory:
     """
 
     def get_reporter(
-        self, reporter_type: str
+        self, reporter_type: str, cache: Optional[FigureCache] = None
     ) -> Union[ReporterPlotly, ReporterMatplotlib]:
         if reporter_type == "plotly":
-            return ReporterPlotly()
+            return ReporterPlotly(cache)
         elif reporter_type == "matplotlib":
             return ReporterMatplotlib()
         else:
@@ -4,11 +4,13 @@
 # We need to specify the absolute paths the data and config files are located in and fixate the JETester class.
 
 
+import json
 import pytest
 import os
 
 import pandas as pd
 
+from modules.events import ENVIRONMENT_VARIABLE, log
 from modules.JET import JETester
 from reports.reports import ReporterFactory, ReportContext
 
@@ -39,3 +41,57 @@ def dataframe():
 @pytest.fixture
 def options():
     return ReportContext(title="Test Report", color="blue", x="x", y="y")
+
+
+@pytest.fixture
+def journal():
+    return pd.DataFrame(
+        {
+            "document_number": [1, 1, 2, 2, 3, 3, 4, 4, 4],
+            "account": [
+                "1000",
+                "4000",
+                "1000",
+                "4000",
+                "1000",
+                "4000",
+                "6000",
+                "1000",
+                "2000",
+            ],
+            "amount": [100.0, -100.0, 250.0, -250.0, 80.0, -80.0, 50.0, 25.0, -75.0],
+        }
+    )
+
+
+@pytest.fixture
+def process_log(monkeypatch):
+    # the event log of the process starts unconfigured and empty, and is
+    # restored after the test, also if the test configures it
+    monkeypatch.setattr(log, "directory", None)
+    monkeypatch.setattr(log, "_buffer", [])
+    monkeypatch.setattr(log, "_counters", {})
+    monkeypatch.setattr(log, "_flushed", {})
+    monkeypatch.delenv(ENVIRONMENT_VARIABLE, raising=False)
+    return log
+
+
+@pytest.fixture
+def engagement_path(tmp_path, process_log) -> str:
+    with open(tmp_path / "config.json", "w") as f:
+        json.dump({"dependencies": ["os"]}, f)
+    with open(tmp_path / "data.json", "w") as f:
+        json.dump(
+            {
+                "document_number": [1, 1, 2, 2],
+                "account": ["1000", "4000", "1000", "4000"],
+                "amount": [100.0, -100.0, 250.0, -250.0],
+            },
+            f,
+        )
+    return str(tmp_path) + os.sep
+
+
+@pytest.fixture
+def engagement(engagement_path):
+    return JETester(engagement_path, ReporterFactory().get_reporter("plotly"))
@@ -0,0 +1,32 @@
+from helpers.aho_corasick import KeywordAutomaton
+
+
+def test_search_finds_all_keywords():
+    automaton = KeywordAutomaton(["adjust", "per CFO", "plug", "just"])
+
+    assert automaton.search("Year-end ADJUSTMENT per cfo") == {
+        "adjust",
+        "just",
+        "per CFO",
+    }
+
+
+def test_search_overlapping_keywords():
+    automaton = KeywordAutomaton(["he", "she", "his", "hers"])
+
+    assert automaton.search("ushers") == {"he", "she", "hers"}
+
+
+def test_search_without_match():
+    automaton = KeywordAutomaton(["reverse", ""])
+
+    assert automaton.search("regular accrual") == frozenset()
+    assert automaton.search("") == frozenset()
+    assert automaton.keywords == ["reverse"]
+
+
+def test_search_casefolds_non_ascii():
+    automaton = KeywordAutomaton(["storno", "STRASSE", "régularisation"])
+
+    assert automaton.search("Stornobuchung Hauptstraße") == {"storno", "STRASSE"}
+    assert automaton.search("RÉGULARISATION") == {"régularisation"}
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.bitsets import FlagSet
+
+
+@pytest.fixture
+def weekend():
+    return FlagSet.from_mask(
+        [True, False, True, True, False, False, True, False, True, False, True]
+    )
+
+
+@pytest.fixture
+def round_amount():
+    return FlagSet.from_positions([0, 1, 2, 9, 10], 11)
+
+
+def test_roundtrip(weekend):
+    mask = [True, False, True, True, False, False, True, False, True, False, True]
+
+    assert weekend.to_mask().tolist() == mask
+    assert weekend.positions().tolist() == [0, 2, 3, 6, 8, 10]
+    assert weekend.count() == 6
+    assert len(weekend) == 11
+    assert weekend.bits.nbytes == 2
+
+
+def test_slice(weekend):
+    assert weekend.slice(8, 20).tolist() == [True, False, True]
+    with pytest.raises(ValueError):
+        weekend.slice(3, 8)
+
+
+def test_and_or_xor_sub(weekend, round_amount):
+    assert (weekend & round_amount).positions().tolist() == [0, 2, 10]
+    assert (weekend | round_amount).positions().tolist() == [0, 1, 2, 3, 6, 8, 9, 10]
+    assert (weekend ^ round_amount).positions().tolist() == [1, 3, 6, 8, 9]
+    assert (weekend - round_amount).positions().tolist() == [3, 6, 8]
+
+
+def test_invert_clears_padding(weekend):
+    inverted = ~weekend
+
+    assert inverted.positions().tolist() == [1, 4, 5, 7, 9]
+    assert inverted.count() == 5
+    assert ~inverted == weekend
+
+
+def test_size_mismatch(weekend):
+    with pytest.raises(ValueError):
+        weekend & FlagSet.from_mask([True])
+    with pytest.raises(TypeError):
+        weekend | np.ones(11, dtype=bool)
+
+
+def test_from_frame_uses_boolean_columns():
+    result = pd.DataFrame({"weekend": [True, False], "keywords": [{"a"}, set()]})
+    flags = FlagSet.from_frame(result)
+
+    assert list(flags) == ["weekend"]
+    assert flags["weekend"].positions().tolist() == [0]
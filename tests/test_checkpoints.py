@@ -0,0 +1,85 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.bitsets import FlagSet
+from modules.checkpoints import CheckpointStore, fingerprint
+
+
+def test_fingerprint_depends_on_content():
+    df = pd.DataFrame({"amount": [1.0, 2.0]})
+
+    assert fingerprint(df) == fingerprint(df.copy())
+    assert fingerprint(df) != fingerprint(df.assign(amount=[1.0, 3.0]))
+    assert fingerprint(df) != fingerprint(df.rename(columns={"amount": "value"}))
+    assert fingerprint(np.arange(3)) != fingerprint(np.arange(4))
+    assert fingerprint({"a": 1}) == fingerprint({"a": 1})
+    assert fingerprint({"gaps": df}) != fingerprint({"gaps": df.head(1)})
+    assert fingerprint(FlagSet.from_mask([True])) != fingerprint(
+        FlagSet.from_mask([False])
+    )
+    assert fingerprint(pd.Series([{"a"}, set()]))
+
+
+def test_run_skips_completed_stage(tmp_path):
+    calls = []
+
+    def stage(value):
+        calls.append(value)
+        return value * 2
+
+    store = CheckpointStore(str(tmp_path))
+    assert store.run("double", stage, 21) == 42
+    assert store.run("double", stage, 21) == 42
+    assert calls == [21]
+
+    # a new store reads the manifest of the previous run
+    assert CheckpointStore(str(tmp_path)).run("double", stage, 21) == 42
+    assert calls == [21]
+
+    assert store.run("double", stage, 1) == 2
+    assert calls == [21, 1]
+
+
+def test_failed_stage_is_not_recorded(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+
+    def crash(value):
+        raise RuntimeError("reporter crashed")
+
+    with pytest.raises(RuntimeError):
+        store.run("report", crash, 1)
+    assert "report" not in store.manifest
+
+
+def test_invalidate(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.run("load", lambda value: value, 1)
+    store.run("prepare", lambda value: value, 2)
+
+    store.invalidate("load")
+    assert list(store.manifest) == ["prepare"]
+
+    store.invalidate()
+    assert store.manifest == {}
+
+
+def test_concurrent_runs_of_a_stage(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    calls = []
+
+    def stage(value):
+        calls.append(value)
+        time.sleep(0.05)
+        return pd.DataFrame({"value": [value]})
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(executor.map(lambda _: store.run("run", stage, 1), range(8)))
+
+    assert calls == [1]
+    assert all(output.equals(outputs[0]) for output in outputs)
+    assert not [file for file in os.listdir(store.path) if file.endswith(".tmp")]
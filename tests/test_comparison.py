@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.comparison import PeriodComparison
+
+
+@pytest.fixture
+def prior():
+    return pd.DataFrame(
+        {
+            "document_number": [1, 1, 2, 2],
+            "account": ["1000", "4000", "1000", "4000"],
+            "user": ["JDOE", "JDOE", "MMAX", "MMAX"],
+            "posting_date": pd.to_datetime(["2022-01-10"] * 2 + ["2022-02-10"] * 2),
+            "amount": [100.0, -100.0, 100.0, -100.0],
+        }
+    )
+
+
+@pytest.fixture
+def current():
+    return pd.DataFrame(
+        {
+            "document_number": [1, 1, 2, 2, 3, 3, 4, 4],
+            "account": ["1000", "4000", "1000", "4000", "1000", "4000", "6000", "1000"],
+            "user": ["JDOE", "JDOE", "NEW", "NEW", "JDOE", "JDOE", None, None],
+            "posting_date": pd.to_datetime(
+                ["2023-01-05"] * 2 + ["2023-01-06"] * 2 + ["2023-02-07"] * 4
+            ),
+            "amount": [100.0, -100.0, 100.0, -100.0, 90.0, -90.0, 50.0, -50.0],
+        }
+    )
+
+
+def test_shared_codes(current, prior):
+    comparison = PeriodComparison(current, prior.assign(account=["9000"] * 4))
+    current_codes, prior_codes, keys = comparison.codes("account")
+
+    assert list(keys) == ["1000", "4000", "6000", "9000"]
+    assert keys.take(current_codes).tolist() == current["account"].tolist()
+    assert prior_codes.tolist() == [3, 3, 3, 3]
+
+
+def test_new_accounts_and_users(current, prior):
+    comparison = PeriodComparison(current, prior)
+
+    assert comparison.new_accounts().tolist() == ["6000"]
+    assert comparison.new_users().tolist() == ["NEW"]
+
+
+def test_new_account_pairs(current, prior):
+    pairs = PeriodComparison(current, prior).new_account_pairs()
+
+    assert pairs.values.tolist() == [["6000", "1000"]]
+
+
+def test_new_account_pairs_in_many_documents(current):
+    documents = np.repeat(np.arange(256), 2)
+    prior = pd.DataFrame(
+        {
+            "document_number": documents,
+            "account": ["1000", "4000"] * 256,
+            "amount": [100.0, -100.0] * 256,
+        }
+    )
+    pairs = PeriodComparison(current, prior).new_account_pairs()
+
+    assert pairs.values.tolist() == [["6000", "1000"]]
+
+
+def test_volume_changes(current, prior):
+    changes = PeriodComparison(current, prior).volume_changes(threshold=0.5)
+    changes = changes.set_index(["account", "month"])
+
+    january = changes.loc[("1000", np.datetime64("2023-01"))]
+    assert january["current_count"] == 2
+    assert january["prior_count"] == 1
+    assert january["count_change"] == 1.0
+
+    assert np.isinf(changes.loc[("6000", np.datetime64("2023-02")), "count_change"])
+    assert ("4000", np.datetime64("2023-02")) not in changes.index
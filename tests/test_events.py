@@ -0,0 +1,109 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from helpers.helper_funcs import exception_handler
+from modules.events import EventLog, log, read_counters, read_events
+from modules.jet_tetsts import JB0
+
+from fixtures import process_log
+
+
+def count_rows(rows):
+    log.count("rows", rows)
+    log.emit("chunk", rows=rows)
+    return os.getpid()
+
+
+def test_buffered_until_flush(tmp_path):
+    events = EventLog(str(tmp_path), batch_size=3)
+    events.emit("first")
+    assert read_events(str(tmp_path)).empty
+
+    events.emit("second", value=1)
+    events.emit("third")
+    assert read_events(str(tmp_path))["event"].tolist() == ["first", "second", "third"]
+
+
+def test_without_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("JET_EVENT_LOG", raising=False)
+    events = EventLog()
+    events.emit("first")
+    events.flush()
+    assert events.path() is None
+
+    events.configure(str(tmp_path))
+    events.flush()
+    assert read_events(str(tmp_path))["event"].tolist() == ["first"]
+
+
+def test_without_directory_bounded(monkeypatch):
+    monkeypatch.delenv("JET_EVENT_LOG", raising=False)
+    events = EventLog(batch_size=4)
+    for number in range(10):
+        events.emit("event", number=number)
+
+    # the newest events are kept until a directory is configured
+    assert len(events._buffer) <= 4
+    assert events._buffer[-1]["number"] == 9
+
+
+def test_counters_and_timers(tmp_path):
+    events = EventLog(str(tmp_path))
+    events.count("rows", 10)
+    events.count("rows", 5)
+    events.flush()
+    events.count("rows", 1)
+    with events.timer("scenario", scenario="JB1"):
+        pass
+    events.flush()
+
+    assert events.counters() == {"rows": 16}
+    assert read_counters(str(tmp_path)) == {"rows": 16}
+    (timer,) = read_events(str(tmp_path)).query("event == 'timer'").to_dict("records")
+    assert timer["scenario"] == "JB1" and timer["seconds"] >= 0
+
+    with open(events.path()) as f:
+        assert [json.loads(line)["event"] for line in f] == [
+            "counter",
+            "timer",
+            "counter",
+        ]
+
+
+def test_worker_processes(tmp_path, process_log):
+    log.configure(str(tmp_path))
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pids = set(executor.map(count_rows, [1, 2, 3, 4]))
+    log.count("rows", 10)
+    log.flush()
+
+    assert read_counters(str(tmp_path)) == {"rows": 20}
+    events = read_events(str(tmp_path))
+    assert sorted(events.query("event == 'chunk'")["rows"]) == [1, 2, 3, 4]
+    assert set(events["pid"]) == pids | {os.getpid()}
+
+
+def test_scenario_stages(tmp_path, process_log, capsys):
+    log.configure(str(tmp_path))
+    scenario = JB0()
+    scenario.prepare_data()
+    scenario.print_test_scenario_context()
+    log.flush()
+    assert capsys.readouterr().out.startswith("JB0: Reconciliation")
+
+    events = read_events(str(tmp_path))
+    assert events["event"].tolist()[-2:] == ["stage", "message"]
+    assert (events["scenario"].tail(2) == "JB0").all()
+
+
+def test_exception_handler(tmp_path, monkeypatch, process_log):
+    monkeypatch.setattr("sys.__excepthook__", lambda *args: None)
+    log.configure(str(tmp_path))
+    exception_handler(ValueError, ValueError("test error"), None)
+
+    (event,) = (
+        read_events(str(tmp_path)).query("event == 'exception'").to_dict("records")
+    )
+    assert event["type"] == "ValueError"
+    assert event["message"] == "test error"
@@ -0,0 +1,163 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from unittest.mock import Mock
+
+from modules.events import read_counters
+from modules.importer import JournalImporter, import_source, source_format
+from modules.JET import JETester
+from reports.reports import Report
+
+from fixtures import process_log
+
+
+@pytest.fixture
+def extracts(tmp_path, process_log) -> str:
+    os.mkdir(tmp_path / "extracts")
+    with open(tmp_path / "extracts" / "january.csv", "w") as f:
+        f.write("Belegnummer;Konto;Betrag;Datum\n")
+        f.write("1;1000;1.000,50;31.01.2023\n")
+        f.write("1;4000;1.000,50-;31.01.2023\n")
+        f.write("2;1000;abc;15.01.2023\n")
+    pd.DataFrame(
+        {
+            "Belegnummer": ["3", "3"],
+            "Konto": ["1000", "6000"],
+            "Betrag": [20.0, -20.0],
+            "Datum": ["01.02.2023", "28.02.2023"],
+        }
+    ).to_excel(tmp_path / "extracts" / "february.xlsx", index=False)
+    with open(tmp_path / "extracts" / "march.txt", "w") as f:
+        f.write("4         2000      5         01.03.2023\n")
+
+    with open(tmp_path / "config.json", "w") as f:
+        json.dump(
+            {
+                "schema": {
+                    "Belegnummer": {"field": "document_number", "type": "code"},
+                    "Konto": {"field": "account", "type": "code"},
+                    "Betrag": {
+                        "field": "amount",
+                        "type": "amount",
+                        "decimal": ",",
+                        "thousands": ".",
+                    },
+                    "Datum": {
+                        "field": "posting_date",
+                        "type": "date",
+                        "format": "%d.%m.%Y",
+                    },
+                },
+                "import": {
+                    "sources": [
+                        {"pattern": "extracts/*.csv", "options": {"sep": ";"}},
+                        {"pattern": "extracts/*.xlsx"},
+                        {
+                            "pattern": "extracts/*.txt",
+                            "options": {
+                                "colspecs": [[0, 10], [10, 20], [20, 30], [30, 40]],
+                                "names": ["Belegnummer", "Konto", "Betrag", "Datum"],
+                            },
+                        },
+                    ],
+                    "chunksize": 2,
+                },
+            },
+            f,
+        )
+    return str(tmp_path) + os.sep
+
+
+def test_source_format():
+    assert source_format("a.CSV", {}) == "csv"
+    assert source_format("a.xlsx", {}) == "excel"
+    assert source_format("a.gl", {"format": "fixed_width"}) == "fixed_width"
+    with pytest.raises(ValueError):
+        source_format("a.gl", {})
+
+
+def test_sources_not_found(extracts):
+    importer = JournalImporter(
+        extracts, {"import": {"sources": [{"pattern": "missing/*.csv"}]}}
+    )
+    with pytest.raises(FileNotFoundError):
+        importer.sources()
+    with pytest.raises(KeyError):
+        JournalImporter(extracts, {}).sources()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_import(extracts, max_workers):
+    jet = JETester(extracts, Mock(spec=Report))
+    manifest = jet.import_extracts(max_workers=max_workers)
+
+    assert [entry["file"] for entry in manifest] == [
+        os.path.join("extracts", "january.csv"),
+        os.path.join("extracts", "february.xlsx"),
+        os.path.join("extracts", "march.txt"),
+    ]
+    assert [entry["rows"] for entry in manifest] == [3, 2, 1]
+    assert [entry["totals"]["amount"] for entry in manifest] == [0.0, 0.0, 5.0]
+    assert manifest[0]["failures"]["amount"] == 1
+    assert manifest[0]["dates"]["posting_date"] == [
+        "2023-01-15T00:00:00",
+        "2023-01-31T00:00:00",
+    ]
+
+    assert jet.df["account"].tolist() == [
+        "1000",
+        "4000",
+        "1000",
+        "1000",
+        "6000",
+        "2000",
+    ]
+    assert (
+        jet.df["source"].value_counts()[os.path.join("extracts", "february.xlsx")] == 2
+    )
+    assert not os.path.exists(extracts + os.path.join("imports", "parts"))
+    # the workers count the rows in the event log of the engagement
+    jet.log.flush()
+    counters = read_counters(extracts + "logs")
+    assert (counters["import_files"], counters["import_rows"]) == (3, 6)
+
+    # a new tester reads the imported journal instead of data.json
+    assert len(JETester(extracts, Mock(spec=Report)).df) == 6
+
+
+def test_excel_converted_once(extracts):
+    importer = JournalImporter(extracts, json.load(open(extracts + "config.json")))
+    importer.run(max_workers=1)
+    cache = os.path.join(extracts, "imports", "excel")
+    (converted,) = os.listdir(cache)
+    modified = os.stat(os.path.join(cache, converted)).st_mtime_ns
+
+    journal, manifest = importer.run(max_workers=1)
+    assert os.listdir(cache) == [converted]
+    assert os.stat(os.path.join(cache, converted)).st_mtime_ns == modified
+    assert importer.manifest() == manifest
+    assert len(journal) == 6
+
+
+def test_import_source_streams_chunks(extracts, tmp_path):
+    config = json.load(open(extracts + "config.json"))
+    part = str(tmp_path / "part.parquet")
+    summary = import_source(
+        extracts + os.path.join("extracts", "january.csv"),
+        "csv",
+        {"sep": ";"},
+        config["schema"],
+        part,
+        chunksize=2,
+    )
+
+    # every chunk is written as it is coerced, with the codes as text
+    file = pq.ParquetFile(part)
+    assert file.metadata.num_row_groups == 2
+    assert file.schema_arrow.field("account").type == pa.string()
+    assert summary["rows"] == 3
+    assert pd.read_parquet(part)["account"].tolist() == ["1000", "4000", "1000"]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.indexes import SecondaryIndex, intersect
+
+
+@pytest.fixture
+def accounts():
+    return pd.DataFrame({"account": ["4000", "1000", None, "4000", "2000", "1000"]})
+
+
+def test_build_groups_positions_by_key(accounts):
+    index = SecondaryIndex.build(accounts, "account")
+
+    assert len(index) == 3
+    assert index.lookup("4000").tolist() == [0, 3]
+    assert index.lookup("1000").tolist() == [1, 5]
+    assert index.lookup("2000").tolist() == [4]
+    assert index.offsets[-1] == 5
+
+
+def test_lookup_unknown_key(accounts):
+    index = SecondaryIndex.build(accounts, "account")
+
+    assert index.lookup("9999").tolist() == []
+
+
+def test_lookup_many(accounts):
+    index = SecondaryIndex.build(accounts, "account")
+
+    assert index.lookup_many(["2000", "4000"]).tolist() == [0, 3, 4]
+    assert index.lookup_many(["4000", "4000", "9999"]).tolist() == [0, 3]
+    assert index.lookup_many([]).tolist() == []
+
+
+def test_save_and_load(accounts, tmp_path):
+    index = SecondaryIndex.build(accounts, "account")
+    index.save(tmp_path / "account.npz")
+    loaded = SecondaryIndex.load(tmp_path / "account.npz", "account")
+
+    assert loaded.rows == 6
+    assert loaded.lookup("1000").tolist() == [1, 5]
+    assert loaded.matches(accounts)
+    assert not loaded.matches(accounts.iloc[::-1].reset_index(drop=True))
+
+
+def test_intersect():
+    result = intersect(
+        [np.array([1, 3, 5, 7, 9]), np.array([3, 9]), np.array([0, 3, 9])]
+    )
+
+    assert result.tolist() == [3, 9]
+    assert intersect([np.array([1, 2]), np.array([], dtype=int)]).tolist() == []
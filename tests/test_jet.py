@@ -1,8 +1,25 @@
+import numpy as np
 import pandas as pd
 import os
+import sys
 import pytest
+from unittest.mock import Mock, patch
 
-from fixtures import jet, data_path, project_root
+from modules.bitsets import FlagSet
+from modules.events import ENVIRONMENT_VARIABLE, log, read_events
+from modules.JET import JETester
+from modules.jet_tetsts import JBAccountPairs, JBPreparation, JBUserActivity
+from modules.progress import CancellationToken, OperationCancelled, Progress
+from reports.reports import Report
+
+from fixtures import (
+    jet,
+    data_path,
+    project_root,
+    engagement,
+    engagement_path,
+    process_log,
+)
 
 
 def test_version(jet):
@@ -74,3 +91,324 @@ def test_invalid_export(jet):
 
     with pytest.raises(Exception):
         jet.export_df(df, type="csv")
+
+
+def test_export_named_csv(engagement, engagement_path):
+    df = pd.DataFrame({"col1": [1, 2], "col2": [3, 4]})
+    engagement.export_df(df, type="csv", name="samples")
+    assert os.path.exists(f"{engagement_path}\\samples.csv")
+
+
+def test_sample_random(engagement):
+    df = pd.DataFrame({"amount": range(100)})
+    sample = engagement.sample(df, method="random", size=10, seed=1)
+    assert len(sample) == 10
+    assert sample.equals(engagement.sample(df, method="random", size=10, seed=1))
+
+
+def test_sample_monetary_unit(engagement):
+    df = pd.DataFrame({"amount": [1.0, 1.0, 1_000.0, 1.0]})
+    sample = engagement.sample(df, method="monetary_unit", size=2, seed=1)
+    assert 2 in sample.index
+
+
+def test_sample_stratified(engagement):
+    df = pd.DataFrame({"amount": [5.0, 50.0, 500.0, 7.0, 70.0, 700.0]})
+    sample = engagement.sample(df, method="stratified", size=1, seed=7, bands=[10, 100])
+    assert sorted(sample["stratum"]) == [0, 1, 2]
+    assert sample.equals(
+        engagement.sample(df, method="stratified", size=1, seed=7, bands=[10, 100])
+    )
+
+
+def test_sample_invalid_method(engagement):
+    df = pd.DataFrame({"amount": [1.0]})
+    with pytest.raises(ValueError):
+        engagement.sample(df, method="invalid")
+    with pytest.raises(ValueError):
+        engagement.sample(df, method="stratified")
+
+
+def test_build_indexes_persists(engagement, engagement_path):
+    indexes = engagement.build_indexes()
+
+    assert list(indexes) == ["account"]
+    assert os.path.exists(os.path.join(engagement_path, "indexes", "account.npz"))
+
+
+def test_persisted_index_rebuilt_on_changed_data(engagement, engagement_path):
+    engagement.build_indexes(columns=["account"])
+
+    changed = JETester(engagement_path, Mock(spec=Report))
+    changed.df = changed.df.assign(account=["4000", "1000", "4000", "1000"])
+    changed.build_indexes(columns=["account"])
+
+    assert changed.query(account="1000").index.tolist() == [1, 3]
+
+
+def test_query_by_index(engagement):
+    engagement.build_indexes(columns=["account", "document_number"])
+
+    rows = engagement.query(account="1000", document_number=2)
+    assert rows["amount"].tolist() == [250.0]
+    assert engagement.query(account=["1000", "4000"]).index.tolist() == [0, 1, 2, 3]
+
+
+def test_query_unindexed_column(engagement):
+    engagement.build_indexes(columns=["account"])
+
+    rows = engagement.query(account="4000", amount=-250.0)
+    assert rows.index.tolist() == [3]
+
+
+def test_materialize_flags(engagement):
+    debits = FlagSet.from_mask([True, False, True, False])
+    large = FlagSet.from_mask([False, False, True, True])
+
+    rows = engagement.materialize(debits & large)
+    assert rows["amount"].tolist() == [250.0]
+
+    with pytest.raises(ValueError):
+        engagement.materialize(FlagSet.from_mask([True]))
+
+
+def test_rank_entries(engagement):
+    engagement.config["risk_weights"] = {"weekend": 1.0, "manual": 2.0}
+    flags = {
+        "weekend": FlagSet.from_mask([True, False, True, False]),
+        "manual": FlagSet.from_mask([False, False, True, True]),
+    }
+
+    ranking = engagement.rank_entries(flags, n=2, partition_size=8)
+    assert ranking.index.tolist() == [2, 3]
+    assert ranking["risk_score"].tolist() == [3.0, 2.0]
+
+
+def test_run_scenarios_resumes_after_report_crash(engagement):
+    reporter = Mock(spec=Report)
+    reporter.plot_heatmap.side_effect = RuntimeError("reporter crashed")
+    scenario = JBAccountPairs(reporter)
+    scenario.run_test_scenario = Mock(wraps=scenario.run_test_scenario)
+
+    with pytest.raises(RuntimeError):
+        engagement.run_scenarios({"pairs": scenario})
+
+    reporter.plot_heatmap.side_effect = None
+    results = engagement.run_scenarios({"pairs": scenario})
+
+    assert scenario.run_test_scenario.call_count == 1
+    assert reporter.plot_heatmap.call_count == 2
+    assert results["pairs"]["count"].tolist() == [2]
+
+    # the reports are created on every run, also of resumed scenarios
+    engagement.run_scenarios({"pairs": scenario})
+    assert scenario.run_test_scenario.call_count == 1
+    assert reporter.plot_heatmap.call_count == 3
+
+
+def test_load_stage(engagement, engagement_path):
+    engagement.load()
+    assert list(engagement.checkpoints.manifest) == ["load"]
+
+    resumed = JETester(engagement_path, Mock(spec=Report))
+    resumed._load_data = Mock(side_effect=AssertionError("data.json parsed"))
+    assert resumed.df.equals(engagement.df)
+
+    # a changed data.json is parsed again
+    with open(engagement_path + "data.json", "w") as f:
+        f.write('{"amount": [1.0, 2.0]}')
+    assert len(JETester(engagement_path, Mock(spec=Report)).df) == 2
+
+
+def test_prepare_stage(engagement, engagement_path):
+    engagement.config["schema"] = {
+        "account": {"field": "account", "type": "code"},
+        "amount": {"field": "amount", "type": "amount"},
+    }
+    prepared = engagement.prepare()
+    assert list(prepared.columns) == ["account", "amount"]
+
+    resumed = JETester(engagement_path, Mock(spec=Report))
+    resumed.config = engagement.config
+    with patch.object(JBPreparation, "prepare_data", side_effect=AssertionError):
+        assert resumed.prepare().equals(prepared)
+    assert list(resumed.preparation.failures) == ["account", "amount"]
+    assert resumed.preparation.memory_after.equals(engagement.preparation.memory_after)
+
+
+def test_run_scenarios_parameters_invalidate_checkpoint(engagement):
+    journal = pd.DataFrame(
+        {
+            "document_number": [1, 1, 2, 2],
+            "account": ["1000", "4000", "2000", "5000"],
+            "amount": [100.0, -100.0, 50.0, -50.0],
+        }
+    )
+    first = engagement.run_scenarios(
+        {"pairs": JBAccountPairs(Mock(spec=Report), top_k=1)}, journal, report=False
+    )
+    second = engagement.run_scenarios(
+        {"pairs": JBAccountPairs(Mock(spec=Report), top_k=3)}, journal, report=False
+    )
+
+    assert len(first["pairs"]) == 1
+    assert len(second["pairs"]) == 2
+
+
+def test_digest_cached_until_replaced(engagement, monkeypatch):
+    hashed = []
+    monkeypatch.setattr(
+        "modules.JET.fingerprint", lambda *inputs: hashed.append(1) or "digest"
+    )
+    engagement.digest()
+    engagement.run_scenarios({"pairs": JBAccountPairs(Mock(spec=Report))}, report=False)
+    engagement.run_scenarios({"pairs": JBAccountPairs(Mock(spec=Report))}, report=False)
+    assert len(hashed) == 1
+
+    engagement.df = engagement.df.head(2)
+    engagement.digest()
+    engagement.data = {"amount": [1.0]}
+    engagement.digest()
+    assert len(hashed) == 3
+
+
+def test_run_scenarios_resumed_with_line_flags(engagement, engagement_path):
+    journal = pd.DataFrame(
+        {
+            "document_number": [1, 1, 2, 2],
+            "account": ["1000", "4000", "2000", "5000"],
+            "user": ["JDOE", "JDOE", "MMAX", "MMAX"],
+            "approver": ["JDOE", "JDOE", "BOSS", "BOSS"],
+            "amount": [100.0, -100.0, 50.0, -50.0],
+        }
+    )
+    engagement.run_scenarios(
+        {"users": JBUserActivity(Mock(spec=Report))}, journal, report=False
+    )
+
+    # a new tester on the engagement restores the result and the line flags
+    resumed = JETester(engagement_path, Mock(spec=Report))
+    scenario = JBUserActivity(Mock(spec=Report))
+    scenario.run_test_scenario = Mock(side_effect=AssertionError("not resumed"))
+    resumed.run_scenarios({"users": scenario}, journal, report=False)
+
+    assert scenario.flags()["self_approved"].positions().tolist() == [0, 1]
+    assert scenario.result["user"].tolist() == ["JDOE", "MMAX"]
+
+
+def test_run_scenarios_cancelled_between_scenarios(engagement):
+    token = CancellationToken()
+    progress = Progress(
+        callback=lambda p: p.done and token.cancel(), token=token, interval=0
+    )
+    scenarios = {
+        "first": JBAccountPairs(Mock(spec=Report)),
+        "second": JBAccountPairs(Mock(spec=Report)),
+    }
+
+    with pytest.raises(OperationCancelled):
+        engagement.run_scenarios(scenarios, report=False, progress=progress)
+
+    assert list(engagement.checkpoints.manifest) == ["load", "first:run"]
+    assert scenarios["second"].result is None
+
+
+def test_rank_entries_progress(engagement):
+    engagement.config["risk_weights"] = {"weekend": 1.0}
+    reports = []
+    progress = Progress(callback=lambda p: reports.append(p.done), interval=0)
+    flags = {"weekend": np.array([True, False, True, False] * 4)}
+
+    engagement.rank_entries(
+        flags,
+        partition_size=8,
+        dataframe=pd.DataFrame(index=range(16)),
+        progress=progress,
+    )
+    assert reports == [0, 8, 16, 16]
+
+
+def test_run_scenarios_parallel(engagement):
+    engagement.config["memory_budget"] = "1G"
+    scenarios = {
+        "first": JBAccountPairs(Mock(spec=Report)),
+        "second": JBAccountPairs(Mock(spec=Report), top_k=1),
+    }
+
+    results = engagement.run_scenarios(scenarios, max_workers=2)
+
+    assert list(results) == ["first", "second"]
+    assert len(results["second"]) == 1
+    assert scenarios["first"].reporter.plot_heatmap.call_count == 1
+    assert set(engagement.checkpoints.manifest) == {"load", "first:run", "second:run"}
+
+
+def test_compare(engagement, engagement_path):
+    prior = JETester(engagement_path, Mock(spec=Report))
+    prior.df = engagement._get_df().iloc[:2]
+
+    comparison = engagement.compare(prior)
+    assert comparison.new_accounts().tolist() == []
+    assert len(comparison.current) == 4
+
+
+def test_lazy_data(engagement_path):
+    os.rename(engagement_path + "data.json", engagement_path + "journal.json")
+    jet = JETester(engagement_path, Mock(spec=Report))
+    assert jet.config == {"dependencies": ["os"]}
+
+    os.rename(engagement_path + "journal.json", engagement_path + "data.json")
+    assert len(jet.df) == 4
+    assert jet.data["account"] == ["1000", "4000", "1000", "4000"]
+
+
+def test_dependencies_not_imported(engagement):
+    sys.modules.pop("tabnanny", None)
+    engagement.config = {"dependencies": ["tabnanny"]}
+    engagement._check_dependencies()
+    assert "tabnanny" not in sys.modules
+
+
+def test_run_scenarios_event_log(engagement, engagement_path):
+    engagement.run_scenarios({"pairs": JBAccountPairs(Mock(spec=Report))}, report=False)
+
+    events = read_events(engagement_path + "logs")
+    (summary,) = events.query("event == 'summary'").to_dict("records")
+    assert summary["scenario"] == "pairs" and summary["rows"] == 1
+    assert "run_scenario" in events.query("event == 'timer'")["name"].tolist()
+
+
+def test_event_log_per_engagement(engagement, engagement_path, tmp_path):
+    # the first engagement shares the process log, another one neither
+    # takes it over nor logs into it
+    configured = (log.directory, os.environ.get(ENVIRONMENT_VARIABLE))
+    os.mkdir(tmp_path / "other")
+    with open(tmp_path / "other" / "config.json", "w") as f:
+        f.write('{"dependencies": ["os"]}')
+    other = JETester(str(tmp_path / "other") + os.sep, Mock(spec=Report))
+    engagement.run_scenarios({"pairs": JBAccountPairs(Mock(spec=Report))}, report=False)
+    scenario = JBAccountPairs(Mock(spec=Report))
+    other.run_scenarios({"other pairs": scenario}, engagement.df, report=False)
+
+    assert engagement.log is log and scenario.log is other.log is not log
+    assert configured == (engagement_path + "logs",) * 2
+    assert (log.directory, os.environ.get(ENVIRONMENT_VARIABLE)) == configured
+    summaries = {
+        directory: read_events(directory).query("event == 'summary'")["scenario"]
+        for directory in (engagement_path + "logs", other.log.directory)
+    }
+    assert summaries[engagement_path + "logs"].tolist() == ["pairs"]
+    assert summaries[other.log.directory].tolist() == ["other pairs"]
+
+
+def test_load_progress(engagement, engagement_path):
+    reports = []
+    progress = Progress(callback=lambda p: reports.append(p.done), interval=0)
+    assert len(engagement.load(progress)) == 4
+    assert (progress.unit, reports[-1]) == ("columns", 3)
+
+    engagement.df.to_parquet(engagement_path + "journal.parquet", index=False)
+    reports.clear()
+    loaded = engagement.load(progress, batch_size=3)
+    assert loaded.equals(engagement.df)
+    assert reports == [0, 3, 4, 4]
@@ -0,0 +1,383 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fixtures import journal
+from modules.jet_tetsts import (
+    JBAccountPairs,
+    JBDocumentSequence,
+    JBKeywords,
+    JBPreparation,
+    JBRoundAmounts,
+    JBTiming,
+    JBUserActivity,
+)
+from modules.progress import CancellationToken, OperationCancelled, Progress
+from reports.reports import Report
+
+
+def test_account_pairs_counts_documents(journal):
+    scenario = JBAccountPairs(Mock(spec=Report))
+    scenario.prepare_data(journal)
+    pairs = scenario.pairs.tocsr()
+    accounts = list(scenario.accounts)
+
+    assert pairs[accounts.index("1000"), accounts.index("4000")] == 3
+    assert pairs[accounts.index("4000"), accounts.index("1000")] == 0
+    assert pairs.sum() == 5
+
+
+def test_account_pairs_top_k_are_rarest(journal):
+    scenario = JBAccountPairs(Mock(spec=Report), top_k=2)
+    scenario.prepare_data(journal)
+    result = scenario.run_test_scenario()
+
+    assert len(result) == 2
+    assert set(result["credit_account"]) == {"2000"}
+    assert set(result["debit_account"]) == {"1000", "6000"}
+    assert (result["count"] == 1).all()
+    assert result["rarity"].is_monotonic_decreasing
+
+
+def test_account_pairs_report_uses_top_k_only(journal):
+    reporter = Mock(spec=Report)
+    scenario = JBAccountPairs(reporter, top_k=2)
+    scenario.prepare_data(journal)
+    scenario.run_test_scenario()
+    scenario.create_report()
+
+    heatmap, context = reporter.plot_heatmap.call_args.args
+    assert heatmap.shape == (2, 1)
+    assert context.x == ["2000"]
+
+
+def test_timing_flags():
+    dataframe = pd.DataFrame(
+        {
+            "posting_date": pd.to_datetime(
+                [
+                    "2023-03-15 10:00",  # wednesday, nothing to flag
+                    "2023-03-18 10:00",  # saturday
+                    "2023-04-07 10:00",  # holiday
+                    "2023-03-15 21:30",  # after hours
+                    "2023-03-30 09:00",  # period end
+                    None,
+                ]
+            )
+        }
+    )
+    config = {
+        "holidays": ["2023-04-07"],
+        "business_hours": [8, 18],
+        "period_end_days": 2,
+    }
+    scenario = JBTiming(Mock(spec=Report), config, time_column="entry_timestamp")
+    scenario.prepare_data(dataframe.assign(entry_timestamp=dataframe["posting_date"]))
+    result = scenario.run_test_scenario()
+
+    assert result["weekend"].tolist() == [False, True, False, False, False, False]
+    assert result["holiday"].tolist() == [False, False, True, False, False, False]
+    assert result["after_hours"].tolist() == [False, False, False, True, False, False]
+    assert result["period_end"].tolist() == [False, False, False, False, True, False]
+
+    # posting dates have no time of day, without entry timestamps nothing
+    # is flagged after hours
+    scenario = JBTiming(Mock(spec=Report), config)
+    scenario.prepare_data(dataframe)
+    assert not scenario.run_test_scenario()["after_hours"].any()
+
+
+def test_timing_configured_period_ends():
+    dataframe = pd.DataFrame(
+        {"posting_date": pd.to_datetime(["2023-06-28", "2023-07-10"])}
+    )
+    scenario = JBTiming(
+        Mock(spec=Report), {"period_ends": ["2023-12-31", "2023-07-11"]}
+    )
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario()
+
+    assert result["period_end"].tolist() == [False, True]
+    assert not result["after_hours"].any()
+
+
+def test_document_sequence():
+    dataframe = pd.DataFrame(
+        {
+            "company": ["A"] * 7 + ["B"] * 2,
+            "document_type": ["SA"] * 9,
+            "document_number": [1, 1, 2, 5, 5, 10_000_000, 4, 1, 3],
+            "posting_date": pd.to_datetime(
+                [
+                    "2023-01-02",
+                    "2023-01-02",
+                    "2023-01-03",
+                    "2023-01-05",
+                    "2023-02-01",
+                    "2023-01-06",
+                    "2023-01-01",
+                    "2023-01-01",
+                    "2023-01-02",
+                ]
+            ),
+        }
+    )
+    scenario = JBDocumentSequence(Mock(spec=Report))
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario()
+
+    gaps = result["gaps"]
+    assert gaps[["company", "start", "end"]].values.tolist() == [
+        ["A", 3, 3],
+        ["A", 6, 9_999_999],
+        ["B", 2, 2],
+    ]
+    assert gaps["missing"].sum() == 1 + 9_999_994 + 1
+
+    duplicates = result["duplicates"]
+    assert duplicates[
+        ["company", "document_number", "occurrences"]
+    ].values.tolist() == [["A", 5, 2]]
+
+    out_of_order = result["out_of_order"]
+    assert out_of_order[["company", "document_number"]].values.tolist() == [["A", 4]]
+
+
+def test_document_sequence_invalid_numbers():
+    dataframe = pd.DataFrame(
+        {
+            "company": ["A", "A", "A"],
+            "document_type": ["SA", "SA", "SA"],
+            "document_number": ["1", "X-2", "3"],
+            "posting_date": pd.to_datetime(["2023-01-01"] * 3),
+        }
+    )
+    scenario = JBDocumentSequence(Mock(spec=Report))
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario()
+
+    assert scenario.invalid.tolist() == [1]
+    assert result["gaps"][["start", "end"]].values.tolist() == [[2, 2]]
+
+
+@pytest.mark.parametrize(
+    "numbers",
+    [
+        ["9007199254740993", "10.5", " 9007199254740995 ", "10.0"],
+        [9007199254740993, 10, 9007199254740995, 10],
+        [3.0, 10.5, 5.0, np.nan],
+    ],
+)
+def test_document_sequence_parses_integers_exactly(numbers):
+    dataframe = pd.DataFrame(
+        {
+            "company": ["A"] * 4,
+            "document_type": ["SA"] * 4,
+            "document_number": numbers,
+            "posting_date": pd.to_datetime(["2023-01-01"] * 4),
+        }
+    )
+    scenario = JBDocumentSequence(Mock(spec=Report))
+    scenario.prepare_data(dataframe)
+
+    # fractions are no document numbers, large numbers keep every digit
+    expected = {
+        str: ([1], [9007199254740993, 9007199254740995, 10]),
+        int: ([], [9007199254740993, 10, 9007199254740995, 10]),
+        float: ([1, 3], [3, 5]),
+    }[type(numbers[0])]
+    assert (scenario.invalid.tolist(), scenario.numbers.tolist()) == expected
+
+
+def test_keywords_maps_hits_to_line_items():
+    dataframe = pd.DataFrame(
+        {
+            "description": [
+                "Manual adjustment per CFO",
+                "Rent March",
+                "Manual adjustment per CFO",
+                None,
+                "Reverse plug",
+            ]
+        }
+    )
+    scenario = JBKeywords(
+        Mock(spec=Report), {"keywords": ["adjust", "per cfo", "plug", "reverse"]}
+    )
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario()
+
+    assert len(scenario.descriptions) == 3
+    assert result["flagged"].tolist() == [True, False, True, False, True]
+    assert result["keywords"].tolist() == [
+        {"adjust", "per cfo"},
+        set(),
+        {"adjust", "per cfo"},
+        set(),
+        {"reverse", "plug"},
+    ]
+
+
+def test_preparation_coerces_with_config_schema():
+    dataframe = pd.DataFrame({"Betrag": ["1,50", "x"], "Konto": [1000, 2000]})
+    config = {
+        "schema": {
+            "Betrag": {"field": "amount", "type": "amount", "decimal": ","},
+            "Konto": {"field": "account", "type": "code"},
+        }
+    }
+    preparation = JBPreparation(Mock(spec=Report), config)
+    prepared = preparation.prepare_data(dataframe)
+
+    assert prepared["amount"].tolist()[0] == 1.5
+    assert preparation.failures["amount"].tolist() == [1]
+    assert preparation.memory_before["column"].tolist() == ["Index", "Betrag", "Konto"]
+    assert preparation.memory_after["column"].tolist() == ["Index", "amount", "account"]
+
+
+def test_preparation_without_schema():
+    with pytest.raises(KeyError, match="config.json"):
+        JBPreparation(Mock(spec=Report), {}).prepare_data(pd.DataFrame({"x": [1]}))
+
+
+def test_scenario_flags():
+    dataframe = pd.DataFrame(
+        {"posting_date": pd.to_datetime(["2023-03-18", "2023-03-15", "2023-03-19"])}
+    )
+    scenario = JBTiming(Mock(spec=Report))
+    scenario.prepare_data(dataframe)
+    scenario.run_test_scenario()
+    flags = scenario.flags()
+
+    assert set(flags) == {"weekend", "holiday", "after_hours", "period_end"}
+    assert flags["weekend"].positions().tolist() == [0, 2]
+    assert JBAccountPairs(Mock(spec=Report)).flags() == {}
+
+
+def test_round_amounts():
+    dataframe = pd.DataFrame(
+        {
+            "amount": [1000.0, -20000.0, 1000.01, 4990.0, 5000.0, 99.99, None, 0.0],
+            "user": ["A", "A", "A", "B", "B", "C", "C", "C"],
+            "account": ["1000"] * 8,
+        }
+    )
+    config = {
+        "round_amounts": [1000, 10000],
+        "approval_thresholds": [5000],
+        "threshold_margin": 0.01,
+    }
+    scenario = JBRoundAmounts(Mock(spec=Report), config)
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario()
+
+    assert result["round_1000"].tolist() == [1, 1, 0, 0, 1, 0, 0, 0]
+    assert result["round_10000"].tolist() == [0, 1, 0, 0, 0, 0, 0, 0]
+    assert result["below_threshold"].tolist() == [0, 0, 0, 1, 0, 0, 0, 0]
+    assert not result["repeated_amount"].any()
+
+
+def test_repeated_amounts_per_user_and_account():
+    dataframe = pd.DataFrame(
+        {
+            "amount": [123.45] * 4 + [-123.45, 10.0],
+            "user": ["A", "A", "A", "B", "A", "A"],
+            "account": ["1000", "1000", "1000", "1000", "1000", "2000"],
+        }
+    )
+    scenario = JBRoundAmounts(Mock(spec=Report), {"repeat_min_count": 3})
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario()
+
+    assert result["repeated_amount"].tolist() == [1, 1, 1, 0, 1, 0]
+
+
+def test_user_activity():
+    dataframe = pd.DataFrame(
+        {
+            "document_number": [1, 1, 2, 2, 3, 3, 4],
+            "account": ["1000", "4000", "1000", "2000", "1000", "4000", "6000"],
+            "user": ["JDOE", "JDOE", "JDOE", "JDOE", "MMAX", "MMAX", None],
+            "approver": ["BOSS", "BOSS", "JDOE", "JDOE", "BOSS", "BOSS", "BOSS"],
+            "amount": [10.0, -10.0, 20.0, -20.0, 5000.0, -5000.0, 1.0],
+        }
+    )
+    config = {"rare_user_max_lines": 2, "large_amount": 1000}
+    scenario = JBUserActivity(Mock(spec=Report), config)
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario().set_index("user")
+
+    assert list(result.index) == ["JDOE", "MMAX"]
+    assert result["lines"].tolist() == [4, 2]
+    assert result["documents"].tolist() == [2, 1]
+    assert result["value"].tolist() == [60.0, 10000.0]
+    assert result["max_amount"].tolist() == [20.0, 5000.0]
+    assert result["accounts"].tolist() == [3, 2]
+    assert result["self_approved"].tolist() == [2, 0]
+    assert result["rarely_active_large"].tolist() == [False, True]
+
+    flags = scenario.flags()
+    assert flags["self_approved"].positions().tolist() == [2, 3]
+    assert flags["rare_user_large"].positions().tolist() == [4, 5]
+
+
+def test_user_activity_flags_not_computed():
+    with pytest.raises(RuntimeError, match="run_test_scenario"):
+        JBUserActivity(Mock(spec=Report)).flags()
+
+
+def test_user_activity_report():
+    reporter = Mock(spec=Report)
+    dataframe = pd.DataFrame(
+        {
+            "document_number": [1],
+            "account": ["1000"],
+            "user": ["JDOE"],
+            "approver": ["BOSS"],
+            "amount": [1.0],
+        }
+    )
+    scenario = JBUserActivity(reporter)
+    scenario.prepare_data(dataframe)
+    scenario.run_test_scenario()
+    scenario.create_report()
+
+    summary, context = reporter.plot_grouped_bar.call_args.args
+    assert len(summary) == 1
+    assert context.y == ["lines", "self_approved"]
+    reporter.plot_box.assert_called_once()
+
+
+def test_chunked_scenario_progress():
+    dataframe = pd.DataFrame(
+        {"posting_date": pd.to_datetime(["2023-03-18", "2023-03-15"] * 3)}
+    )
+    reports = []
+    scenario = JBTiming(Mock(spec=Report))
+    scenario.chunk_size = 2
+    scenario.progress = Progress(
+        callback=lambda p: reports.append((p.task, p.done)), interval=0
+    )
+    scenario.prepare_data(dataframe)
+    result = scenario.run_test_scenario()
+
+    assert result["weekend"].tolist() == [True, False] * 3
+    # started, three chunks and finished
+    assert [done for _, done in reports] == [0, 2, 4, 6, 6]
+    assert {task for task, _ in reports} == {"timing"}
+
+
+def test_chunked_scenario_cancelled():
+    token = CancellationToken()
+    scenario = JBKeywords(Mock(spec=Report), {"keywords": ["storno"]})
+    scenario.chunk_size = 1
+    scenario.progress = Progress(
+        callback=lambda p: p.done and token.cancel(), token=token, interval=0
+    )
+    scenario.prepare_data(pd.DataFrame({"description": ["a", "b", "storno"]}))
+
+    with pytest.raises(OperationCancelled):
+        scenario.run_test_scenario()
+    assert scenario.progress.done == 1
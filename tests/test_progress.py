@@ -0,0 +1,69 @@
+import pytest
+
+from modules.progress import (
+    CancellationToken,
+    OperationCancelled,
+    Progress,
+    print_progress,
+)
+
+
+def test_progress_reports_through_callback():
+    reports = []
+    progress = Progress(
+        callback=lambda p: reports.append((p.done, p.partitions)), interval=0
+    )
+
+    progress.start("scoring", total=300)
+    progress.advance(100)
+    progress.advance(200)
+    progress.finish()
+
+    assert reports == [(0, 0), (100, 1), (300, 2), (300, 2)]
+    assert progress.eta == 0
+
+
+def test_progress_throttles_callback():
+    reports = []
+    progress = Progress(callback=reports.append, interval=60)
+
+    progress.start("scoring", total=10)
+    for _ in range(10):
+        progress.advance(1)
+    progress.finish()
+
+    assert len(reports) == 2
+
+
+def test_progress_eta_unknown_without_total():
+    progress = Progress()
+    progress.start("loading")
+    progress.advance(10)
+
+    assert progress.eta is None
+
+
+def test_cancellation_at_chunk_boundary():
+    token = CancellationToken()
+    progress = Progress(token=token)
+    progress.start("scoring", total=3)
+    progress.advance(1)
+
+    token.cancel()
+    with pytest.raises(OperationCancelled):
+        progress.advance(1)
+    assert progress.done == 2
+
+    token.reset()
+    progress.advance(1)
+
+
+def test_print_progress(capsys):
+    progress = Progress(callback=print_progress, interval=0)
+    progress.start("scoring", total=2_000)
+    progress.advance(1_000)
+    progress.finish()
+
+    output = capsys.readouterr().out
+    assert "\rscoring: 1,000/2,000 rows, 1 partitions" in output
+    assert output.endswith("\n")
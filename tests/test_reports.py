@@ -1,5 +1,12 @@
+from unittest.mock import Mock
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import pytest
+
 from tests.fixtures import dataframe, options
-from reports.reports import ReporterFactory
+from reports.reports import FigureCache, ReportContext, ReporterFactory
 
 
 def test_plot_bar_with_plotly(dataframe, options):
@@ -90,3 +97,66 @@ def test_plot_3d_with_matplotlib(dataframe, options):
 def test_plot_grouped_bar_with_matplotlib(dataframe, options):
     reporter = ReporterFactory().get_reporter("matplotlib")
     reporter.plot_grouped_bar(dataframe, options)
+
+
+@pytest.fixture
+def no_show(monkeypatch):
+    monkeypatch.setattr(go.Figure, "show", lambda self: None)
+
+
+@pytest.fixture
+def bar_options():
+    return ReportContext(title="Test Report", color=None, x="x", y="y")
+
+
+def test_figure_cache_key(dataframe, bar_options):
+    key = FigureCache.key("bar", dataframe, bar_options)
+
+    assert key == FigureCache.key("bar", dataframe.copy(), bar_options)
+    assert key != FigureCache.key("line", dataframe, bar_options)
+    assert key != FigureCache.key("bar", dataframe.assign(y=[4, 5, 7]), bar_options)
+    assert key == FigureCache.key("bar", dataframe.assign(z=[0, 0, 0]), bar_options)
+    bar_options.title = "Other title"
+    assert key != FigureCache.key("bar", dataframe, bar_options)
+
+
+def test_figure_cache_key_whole_frame():
+    matrix = pd.DataFrame({"1000": [1, 0], "2000": [0, 1]}, index=["1000", "2000"])
+    options = ReportContext(title="Pairs", color=None, x=["1000"], y=["1000"])
+    changed = matrix.assign(**{"2000": [5, 5]})
+
+    assert FigureCache.key("heatmap", matrix, options) != FigureCache.key(
+        "heatmap", changed, options
+    )
+    assert FigureCache.key("missing_values", matrix) != FigureCache.key(
+        "missing_values", changed
+    )
+
+
+def test_plotly_reuses_cached_figure(dataframe, bar_options, no_show, monkeypatch):
+    cache = FigureCache()
+    reporter = ReporterFactory().get_reporter("plotly", cache)
+    reporter.plot_bar(dataframe, bar_options)
+
+    monkeypatch.setattr(px, "bar", Mock(side_effect=AssertionError("rebuilt")))
+    reporter.plot_bar(dataframe, bar_options)
+
+    assert len(cache._figures) == 1
+
+
+def test_figure_cache_on_disk(dataframe, bar_options, no_show, tmp_path):
+    reporter = ReporterFactory().get_reporter("plotly", FigureCache(str(tmp_path)))
+    reporter.plot_line(dataframe, bar_options)
+
+    cache = FigureCache(str(tmp_path))
+    figure = cache.get(FigureCache.key("line", dataframe, bar_options))
+    assert figure.layout.title.text == "Test Report"
+
+
+def test_figure_cache_evicts_least_recently_used():
+    cache = FigureCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, go.Figure())
+
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
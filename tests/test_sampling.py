@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from modules.sampling import monetary_unit_sample, random_sample, stratified_sample
+
+
+def test_random_sample_is_reproducible():
+    first = random_sample(1_000, 25, seed=42)
+    second = random_sample(1_000, 25, seed=42)
+
+    assert np.array_equal(first, second)
+    assert len(np.unique(first)) == 25
+    assert np.all(np.diff(first) > 0)
+
+
+def test_random_sample_capped_at_population():
+    assert np.array_equal(random_sample(3, 10, seed=1), [0, 1, 2])
+
+
+def test_monetary_unit_sample_selects_large_items():
+    amounts = np.array([1.0, 1.0, 1_000.0, 1.0, -500.0, np.nan, 1.0])
+    positions = monetary_unit_sample(amounts, 3, seed=7)
+
+    assert {2, 4} <= set(positions)
+    assert 5 not in positions
+    assert np.array_equal(positions, monetary_unit_sample(amounts, 3, seed=7))
+
+
+def test_monetary_unit_sample_empty_population():
+    assert len(monetary_unit_sample(np.array([]), 5, seed=1)) == 0
+    assert len(monetary_unit_sample(np.zeros(3), 5, seed=1)) == 0
+
+
+def test_stratified_sample_per_band():
+    amounts = np.array([5.0, 50.0, 500.0, 7.0, 70.0, 700.0, -9.0, np.nan])
+    positions, strata = stratified_sample(amounts, [10, 100], 2, seed=3)
+
+    assert np.bincount(strata).tolist() == [2, 2, 2]
+    assert 7 not in positions
+    assert np.array_equal(
+        np.searchsorted([10, 100], np.abs(amounts[positions]), side="right"), strata
+    )
+
+
+def test_stratified_sample_sizes_per_stratum():
+    amounts = np.arange(100, dtype=float)
+    positions, strata = stratified_sample(amounts, [50], [1, 5], seed=3)
+
+    assert np.bincount(strata).tolist() == [1, 5]
+
+    with pytest.raises(ValueError):
+        stratified_sample(amounts, [50], [1, 2, 3], seed=3)
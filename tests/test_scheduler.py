@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from modules.jet_tetsts import JournalEntryTests
+from modules.progress import CancellationToken, OperationCancelled, Progress
+from modules.scheduler import ScenarioScheduler, parse_size
+
+
+class Scenario(JournalEntryTests):
+    memory_per_row = 1
+
+    def __init__(self, memory_fixed=0):
+        self.memory_fixed = memory_fixed
+
+    def prepare_data(self):
+        pass
+
+    def run_test_scenario(self):
+        pass
+
+    def create_report(self):
+        pass
+
+    def export_data(self):
+        pass
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = set()
+        self.together = []
+
+    def __call__(self, name, scenario):
+        with self.lock:
+            self.running.add(name)
+            self.together.append(set(self.running))
+        time.sleep(0.05)
+        with self.lock:
+            self.running.remove(name)
+        return name.upper()
+
+
+def test_parse_size():
+    assert parse_size(1024) == 1024
+    assert parse_size("8G") == 8 * 2**30
+    assert parse_size("512 MB") == 512 * 2**20
+    assert parse_size("1.5KiB") == 1536
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_estimate_memory():
+    assert Scenario(memory_fixed=10).estimate_memory(100) == 110
+
+
+def test_admission_within_budget():
+    scenarios = {
+        "large": Scenario(memory_fixed=600),
+        "heavy": Scenario(memory_fixed=500),
+        "small": Scenario(memory_fixed=100),
+    }
+    recorder = Recorder()
+
+    results = ScenarioScheduler(1_000, max_workers=3).run(scenarios, recorder, rows=100)
+
+    assert results == {"large": "LARGE", "heavy": "HEAVY", "small": "SMALL"}
+    assert all(not {"large", "heavy"} <= together for together in recorder.together)
+    assert {"large", "small"} in recorder.together
+
+
+def test_oversized_scenario_runs_alone():
+    scenarios = {"huge": Scenario(memory_fixed=5_000), "small": Scenario()}
+    recorder = Recorder()
+
+    results = ScenarioScheduler(1_000, max_workers=2).run(scenarios, recorder, rows=10)
+
+    assert list(results) == ["huge", "small"]
+    assert {"huge", "small"} not in recorder.together
+
+
+def test_cancellation_stops_admission():
+    token = CancellationToken()
+    progress = Progress(
+        callback=lambda p: p.done and token.cancel(), token=token, interval=0
+    )
+    scenarios = {name: Scenario(memory_fixed=900) for name in ("a", "b", "c")}
+    recorder = Recorder()
+
+    with pytest.raises(OperationCancelled):
+        ScenarioScheduler(1_000, max_workers=3).run(scenarios, recorder, 10, progress)
+
+    assert len(recorder.together) == 1
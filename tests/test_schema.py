@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.schema import coerce, memory_report
+
+
+@pytest.fixture
+def client_journal():
+    return pd.DataFrame(
+        {
+            "Belegnummer": [1000, "1000", "02000", None],
+            "Buchungsdatum": ["01.02.2023", "31.02.2023", None, "01.02.2023"],
+            "Betrag": ["1.234,50", "12,00-", "abc", None],
+            "Manuell": ["X", "", "maybe", "1"],
+            "Kommentar": ["a", "b", "c", "d"],
+        }
+    )
+
+
+@pytest.fixture
+def client_schema():
+    return {
+        "Belegnummer": {"field": "document_number", "type": "code"},
+        "Buchungsdatum": {
+            "field": "posting_date",
+            "type": "date",
+            "format": "%d.%m.%Y",
+        },
+        "Betrag": {
+            "field": "amount",
+            "type": "amount",
+            "decimal": ",",
+            "thousands": ".",
+        },
+        "Manuell": {"field": "manual", "type": "boolean"},
+    }
+
+
+def test_coerce_maps_columns(client_journal, client_schema):
+    prepared, _ = coerce(client_journal, client_schema)
+
+    assert list(prepared.columns) == [
+        "document_number",
+        "posting_date",
+        "amount",
+        "manual",
+    ]
+    assert isinstance(prepared["document_number"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(prepared["posting_date"])
+    assert prepared["amount"].dtype == np.float64
+    assert prepared["manual"].dtype == "boolean"
+
+
+def test_coerce_values(client_journal, client_schema):
+    prepared, _ = coerce(client_journal, client_schema)
+
+    assert prepared["document_number"].tolist()[:3] == ["1000", "1000", "02000"]
+    assert prepared["posting_date"][0] == pd.Timestamp("2023-02-01")
+    assert prepared["amount"].tolist()[:2] == [1234.5, -12.0]
+    assert prepared["manual"].tolist()[:2] == [True, False]
+
+
+def test_coerce_collects_failures(client_journal, client_schema):
+    _, failures = coerce(client_journal, client_schema)
+
+    assert failures["posting_date"].tolist() == [1]
+    assert failures["amount"].tolist() == [2]
+    assert failures["manual"].tolist() == [2]
+    assert failures["document_number"].tolist() == []
+
+
+def test_coerce_invalid_schema(client_journal):
+    with pytest.raises(KeyError):
+        coerce(client_journal, {"Missing": {"field": "amount", "type": "amount"}})
+    with pytest.raises(ValueError):
+        coerce(client_journal, {"Betrag": {"field": "amount", "type": "money"}})
+
+
+def test_memory_report(client_journal):
+    report = memory_report(client_journal)
+
+    assert report["column"].tolist() == ["Index", *client_journal.columns]
+    assert (report["bytes"] > 0).all()
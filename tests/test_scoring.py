@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from modules.bitsets import FlagSet
+from modules.scoring import RiskScorer, partition_flags
+
+
+@pytest.fixture
+def flags():
+    rng = np.random.default_rng(0)
+    return {
+        "weekend": FlagSet.from_mask(rng.random(1_000) < 0.3),
+        "round_amount": FlagSet.from_mask(rng.random(1_000) < 0.2),
+        "severity": rng.random(1_000),
+    }
+
+
+def test_score_weights_flags():
+    scorer = RiskScorer({"weekend": 1.0, "keywords": 3.0, "severity": 2.0})
+    scores = scorer.score(
+        {
+            "weekend": np.array([True, False, True]),
+            "keywords": np.array([False, True, True]),
+            "severity": np.array([0.5, 0.0, 0.25]),
+            "unweighted": np.array([True, True, True]),
+        }
+    )
+
+    assert scores.tolist() == [2.0, 3.0, 4.5]
+
+
+def test_partition_flags(flags):
+    partitions = list(partition_flags(flags, partition_size=300))
+
+    assert [offset for offset, _ in partitions] == [0, 304, 608, 912]
+    assert np.array_equal(
+        np.concatenate([part["weekend"] for _, part in partitions]),
+        flags["weekend"].to_mask(),
+    )
+
+
+def test_top_n_matches_full_sort(flags):
+    scorer = RiskScorer({"weekend": 1.0, "round_amount": 2.0, "severity": 1.5})
+    full = scorer.score(
+        {
+            "weekend": flags["weekend"].to_mask(),
+            "round_amount": flags["round_amount"].to_mask(),
+            "severity": flags["severity"],
+        }
+    )
+
+    ranking = scorer.top_n(partition_flags(flags, partition_size=96), 20)
+
+    assert len(ranking) == 20
+    assert ranking["risk_score"].is_monotonic_decreasing
+    assert np.allclose(ranking["risk_score"], np.sort(full)[::-1][:20])
+    assert np.allclose(full[ranking["position"]], ranking["risk_score"])
+
+
+def test_top_n_skips_unflagged_rows():
+    scorer = RiskScorer({"weekend": 1.0})
+    ranking = scorer.top_n([(0, {"weekend": np.array([False, True, False])})], 5)
+
+    assert ranking["position"].tolist() == [1]
+    assert len(scorer.top_n([(0, {"weekend": np.array([True])})], 0)) == 0
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fixtures import engagement, engagement_path, process_log
+from modules.server import JournalClient, JournalServer, from_arrow, to_arrow
+
+import pandas as pd
+
+
+@pytest.fixture
+def client(engagement):
+    server = JournalServer(engagement, port=0)
+    server.start()
+    yield JournalClient(server.url)
+    server.stop()
+
+
+def test_arrow_round_trip():
+    dataframe = pd.DataFrame(
+        {"account": ["1000", "4000"], "hits": [frozenset({"b", "a"}), frozenset()]},
+        index=[3, 7],
+    )
+    result = from_arrow(to_arrow(dataframe))
+    assert list(result.index) == [3, 7]
+    assert list(result["hits"].map(list)) == [["a", "b"], []]
+
+
+def test_health(client):
+    health = client.health()
+    assert health["rows"] == 4
+    assert "account" in health["indexes"]
+
+
+def test_query(client):
+    result = client.query(account="1000")
+    assert list(result.index) == [0, 2]
+    assert list(client.query(document_number=2).index) == [2, 3]
+
+
+def test_run_scenario(client):
+    result = client.run_scenario("account_pairs")
+    assert result["debit_account"].tolist() == ["1000"]
+    assert result["credit_account"].tolist() == ["4000"]
+
+
+def test_unknown_scenario(client):
+    with pytest.raises(RuntimeError, match="404"):
+        client.run_scenario("unknown")
+
+
+def test_concurrent_scenario_runs(client):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(lambda _: client.run_scenario("account_pairs"), range(4))
+        )
+
+    assert all(len(result) == 1 for result in results)
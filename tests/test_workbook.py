@@ -0,0 +1,121 @@
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from modules.progress import Progress
+from modules.workbook import WorkbookExporter, prepare_sheet, sheet_name, sheets
+
+from fixtures import engagement, engagement_path, process_log
+
+
+def test_sheet_name():
+    assert sheet_name("JB1") == "JB1"
+    assert sheet_name("JB1", 2) == "JB1 (2)"
+    assert sheet_name("a/b:c") == "a_b_c"
+    assert len(sheet_name("x" * 40, 12)) == 31
+
+
+def test_sheets():
+    gaps = pd.DataFrame({"x": [1]})
+    tables = sheets({"JB1": pd.Series([1, 2]), "JB2": {"gaps": gaps}, "JB3": None})
+    assert list(tables) == ["JB1", "JB2 gaps"]
+    assert tables["JB2 gaps"] is gaps
+
+
+def test_prepare_sheet():
+    header, dates, rows = prepare_sheet(
+        pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2023-01-31", None]),
+                "amount": [np.inf, 1.5],
+                "account": pd.Categorical(["1000", None]),
+                "keywords": [frozenset({"b", "a"}), "=SUM(A1)"],
+            },
+            index=[4, 9],
+        )
+    )
+    assert header == ["index", "date", "amount", "account", "keywords"]
+    assert dates == [False, True, False, False, False]
+    assert rows == [
+        (4, datetime.datetime(2023, 1, 31), None, "1000", "a, b"),
+        (9, None, 1.5, None, "=SUM(A1)"),
+    ]
+
+
+def test_invalid_max_rows():
+    with pytest.raises(ValueError):
+        WorkbookExporter(max_rows=0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_export_workbook(engagement, max_workers):
+    results = {
+        "JB1": pd.DataFrame(
+            {
+                "account": ["1000", "4000", "6000"],
+                "posting_date": pd.to_datetime(["2023-01-01"] * 3),
+            }
+        ),
+        "JB2": {"gaps": pd.DataFrame({"document_number": [7]})},
+        "sample": pd.DataFrame({"amount": []}),
+        "JB3": pd.Series([1.5, 2.5, 3.5], index=[4, 9, 12], name="amount"),
+    }
+    path = engagement.export_workbook(results, max_rows=2, max_workers=max_workers)
+
+    workbook = openpyxl.load_workbook(path)
+    assert workbook.sheetnames == [
+        "JB1",
+        "JB1 (2)",
+        "JB2 gaps",
+        "sample",
+        "JB3",
+        "JB3 (2)",
+    ]
+    assert [row for row in workbook["JB1 (2)"].values] == [
+        ("account", "posting_date"),
+        ("6000", datetime.datetime(2023, 1, 1)),
+    ]
+    assert workbook["JB1"]["B2"].number_format == "yyyy-mm-dd"
+    assert workbook["JB2 gaps"]["A2"].value == 7
+    assert [row for row in workbook["sample"].values] == [("amount",)]
+
+    # the same tables are not written again, unless the workbook was deleted
+    modified = os.stat(path).st_mtime_ns
+    assert engagement.export_workbook(results, max_rows=2, max_workers=1) == path
+    assert os.stat(path).st_mtime_ns == modified
+    os.remove(path)
+    assert os.path.exists(engagement.export_workbook(results, max_rows=2))
+    # the row positions of an indexed table continue on the overflow sheet
+    assert [row for row in workbook["JB3 (2)"].values] == [
+        ("index", "amount"),
+        (12, 3.5),
+    ]
+
+
+def test_export_bounded_slices(tmp_path, monkeypatch):
+    submitted, outstanding = [], []
+
+    class Executor(ThreadPoolExecutor):
+        def submit(self, *args):
+            submitted.append(args)
+            return super().submit(*args)
+
+    monkeypatch.setattr("modules.workbook.ProcessPoolExecutor", Executor)
+    progress = Progress(
+        callback=lambda p: outstanding.append(len(submitted) - p.done), interval=0
+    )
+    WorkbookExporter(max_rows=1).export(
+        {"JB1": pd.DataFrame({"x": range(6)})},
+        str(tmp_path / "bounded.xlsx"),
+        max_workers=2,
+        progress=progress,
+    )
+
+    # a slice is submitted once another sheet is written
+    assert len(submitted) == 6
+    assert max(outstanding) <= 2